@@ -35,6 +35,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'core',
@@ -75,6 +76,13 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
 
+# DB_POOL_SIZE > 0 shares at most that many connections between the threads
+# of a worker process, see core.backends.postgresql_pool. Otherwise each
+# thread keeps its connection open for DB_CONN_MAX_AGE seconds (0 closes it
+# after every request). DB_CONN_HEALTH_CHECKS pings a reused connection
+# before a request runs on it, see core.db.check_connections
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+
 DATABASES = {
     'sqlite': {
         'ENGINE': 'django.db.backends.sqlite3',
@@ -82,15 +90,43 @@ DATABASES = {
     },
     'default':
         {
-            'ENGINE': 'django.db.backends.postgresql',
+            'ENGINE': 'core.backends.postgresql_pool' if DB_POOL_SIZE
+            else 'django.db.backends.postgresql',
             'HOST': os.environ.get("DB_HOST"),
             'NAME': os.environ.get("DB_NAME"),
             'USER': os.environ.get("DB_USER"),
             'PASSWORD': os.environ.get("DB_PASSWORD"),
+            # pooled connections go back to the pool after every request
+            'CONN_MAX_AGE': 0 if DB_POOL_SIZE
+            else int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': bool(
+                int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+            ),
+            'POOL_SIZE': DB_POOL_SIZE,
+            'POOL_TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
         }
 
 }
 
+# DB_REPLICA_HOSTS: comma separated hosts of read replicas of the default
+# database. Safe-method API reads go to one of them, see core.replicas
+DATABASE_REPLICAS = []
+for host in filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')):
+    alias = f'replica{len(DATABASE_REPLICAS)}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'}
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+# After a write a user reads from default for STICKY_SECONDS, longer than
+# the replication lag. CACHE_ALIAS must name a cache shared by all workers
+REPLICA_ROUTING = {
+    'STICKY_SECONDS': int(os.environ.get('REPLICA_STICKY_SECONDS', 10)),
+    'CACHE_ALIAS': os.environ.get('REPLICA_PIN_CACHE_ALIAS', 'default'),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -109,6 +145,31 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# New passwords are hashed with PASSWORD_HASHER, older hashes are upgraded
+# to it at the next login. Hashes run on a pool of HASHING_WORKERS threads
+# per process, see core.hashers. Logins past HASHING_ADMITTED concurrent
+# hashes get a 503; keep it below GUNICORN_THREADS
+_HASHERS = {
+    'argon2': 'core.hashers.Argon2PasswordHasher',
+    'bcrypt': 'core.hashers.BCryptSHA256PasswordHasher',
+    'pbkdf2': 'core.hashers.PBKDF2PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _HASHERS.pop(os.environ.get('PASSWORD_HASHER', 'argon2')),
+    *_HASHERS.values(),
+]
+
+PASSWORD_HASHING = {
+    'WORKERS': int(os.environ.get('HASHING_WORKERS', 2)),
+    'TIMEOUT': float(os.environ.get('HASHING_TIMEOUT', 5)),
+    'ADMITTED': int(os.environ.get('HASHING_ADMITTED', 2)),
+    'ARGON2_TIME_COST': int(os.environ.get('ARGON2_TIME_COST', 2)),
+    # KiB
+    'ARGON2_MEMORY_COST': int(os.environ.get('ARGON2_MEMORY_COST', 19456)),
+    'ARGON2_PARALLELISM': int(os.environ.get('ARGON2_PARALLELISM', 1)),
+    'BCRYPT_ROUNDS': int(os.environ.get('BCRYPT_ROUNDS', 12)),
+}
+
 # Internationalization
 # https://docs.djangoproject.com/en/2.1/topics/i18n/
 
@@ -132,3 +193,116 @@ MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
 AUTH_USER_MODEL = 'core.User'
+
+# API_JSON=orjson renders and parses the JSON of DRF's json classes on
+# orjson, several times faster; API_JSON=json keeps DRF's own
+_JSON = {
+    'orjson': ('core.renderers.ORJSONRenderer',
+               'core.renderers.ORJSONParser'),
+    'json': ('rest_framework.renderers.JSONRenderer',
+             'rest_framework.parsers.JSONParser'),
+}
+_JSON_RENDERER, _JSON_PARSER = _JSON[os.environ.get('API_JSON', 'orjson')]
+
+REST_FRAMEWORK = {
+    # JSON first, settings_production drops the browsable API
+    'DEFAULT_RENDERER_CLASSES': [
+        _JSON_RENDERER,
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        _JSON_PARSER,
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_PAGINATION_CLASS': 'recipe.pagination.RecipeCursorPagination',
+    'PAGE_SIZE': int(os.environ.get('PAGE_SIZE', 50)),
+    # proxies in front of the app appending to X-Forwarded-For; with 0 the
+    # anonymous throttles key on REMOTE_ADDR, as a client can forge the
+    # header. settings_production sets 1 for the nginx proxy
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
+    # token buckets, see core.throttling
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.UserBucketThrottle',
+        'core.throttling.AnonBucketThrottle',
+        'core.throttling.ScopedBucketThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'user': os.environ.get('THROTTLE_USER', '1200/min'),
+        'anon': os.environ.get('THROTTLE_ANON', '120/min'),
+        'login': os.environ.get('THROTTLE_LOGIN', '20/min'),
+        'recipe_write': os.environ.get('THROTTLE_RECIPE_WRITE', '120/min'),
+        'bulk_write': os.environ.get('THROTTLE_BULK_WRITE', '60/min'),
+        'image_upload': os.environ.get('THROTTLE_IMAGE_UPLOAD', '30/min'),
+        'export': os.environ.get('THROTTLE_EXPORT', '30/min'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Throttle buckets are per worker process by default. To share them
+    # between the workers of a host, point this at e.g. a FileBasedCache
+    # directory on a tmpfs, or at memcached
+    'throttle': {
+        'BACKEND': os.environ.get(
+            'THROTTLE_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('THROTTLE_CACHE_LOCATION', 'throttle'),
+    },
+}
+THROTTLE_CACHE_ALIAS = 'throttle'
+
+# Token -> user lookups cached by user.authentication.CachedTokenAuthentication
+# CACHE_ALIAS optionally names an entry of CACHES shared by all workers,
+# each worker then keeps its own copy of a token for LOCAL_TTL seconds
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': int(os.environ.get('TOKEN_AUTH_CACHE_SIZE', 10000)),
+    'TTL': int(os.environ.get('TOKEN_AUTH_CACHE_TTL', 60)),
+    'LOCAL_TTL': int(os.environ.get('TOKEN_AUTH_CACHE_LOCAL_TTL', 5)),
+    'CACHE_ALIAS': os.environ.get('TOKEN_AUTH_CACHE_ALIAS'),
+}
+
+# Tokens expire TTL seconds after their last renewal. A token used more
+# than RENEW_AFTER seconds after it was renewed is renewed again, and
+# the sweep_tokens command deletes the expired ones
+TOKEN_EXPIRY = {
+    'TTL': int(os.environ.get('TOKEN_TTL', 14 * 24 * 3600)),
+    'RENEW_AFTER': int(os.environ.get('TOKEN_RENEW_AFTER', 24 * 3600)),
+}
+
+# Background resizing of uploaded recipe images, see recipe.images
+IMAGE_PROCESSING = {
+    'WORKERS': int(os.environ.get('IMAGE_WORKERS', 2)),
+    'VARIANTS': {'small': 320, 'large': 1280},
+    'WEBP_QUALITY': 80,
+}
+
+# Largest recipe image accepted by upload-image, in bytes
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_SIZE', 20 * 1024 * 1024)
+)
+
+# Per-user cache of recipe/tag/ingredient read responses, see recipe.caching
+RESPONSE_CACHE = {
+    'CACHE_ALIAS': os.environ.get('RESPONSE_CACHE_ALIAS', 'default'),
+    'TIMEOUT': int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300)),
+    # longest a stale collection version can be served after a write
+    'VERSION_TIMEOUT': int(
+        os.environ.get('RESPONSE_CACHE_VERSION_TIMEOUT', 5)
+    ),
+}
+
+# Most items accepted by one request to the <list>/bulk/ endpoints
+BULK_MAX_ITEMS = int(os.environ.get('BULK_MAX_ITEMS', 1000))
+
+# PostgreSQL text search configuration used for ?q= recipe search
+SEARCH_CONFIG = os.environ.get('SEARCH_CONFIG', 'english')
+
+# Upper bound for the ?page_size= query param on the list endpoints
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 500))
+
+# Recipes read and rendered at a time by the streaming export
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 500))
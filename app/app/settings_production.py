@@ -0,0 +1,73 @@
+"""
+Production settings, on top of app.settings.
+
+Select with DJANGO_SETTINGS_MODULE=app.settings_production, as
+docker-compose-deploy.yaml does. DEBUG is off, so Django neither keeps
+nor logs the SQL of every query.
+"""
+
+import os
+
+from app.settings import *  # noqa: F401,F403
+
+DEBUG = False
+
+SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+
+ALLOWED_HOSTS = os.environ['ALLOWED_HOSTS'].split(',')
+
+# Served by the proxy straight from STATIC_ROOT and MEDIA_ROOT, see
+# proxy/default.conf. Hashed names let it cache static files for good
+STATICFILES_STORAGE = \
+    'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'
+
+# The proxy terminates TLS and passes the original scheme and host
+SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+USE_X_FORWARDED_HOST = True
+
+# One memcached for every worker of every container: the response
+# cache and collection versions, replica pins, the shared tier of the
+# token cache and the throttle buckets must agree across processes
+MEMCACHED_LOCATION = os.environ.get('MEMCACHED_LOCATION', 'memcached:11211')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': MEMCACHED_LOCATION.split(','),
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': MEMCACHED_LOCATION.split(','),
+        'KEY_PREFIX': 'throttle',
+    },
+}
+TOKEN_AUTH_CACHE = dict(
+    TOKEN_AUTH_CACHE,  # noqa: F405
+    CACHE_ALIAS=os.environ.get('TOKEN_AUTH_CACHE_ALIAS', 'default'),
+)
+
+# JSON only: the browsable API builds a whole HTML page, forms and all,
+# for any client that asks for text/html. Throttles key anonymous
+# clients on the address the proxy appends to X-Forwarded-For, the
+# last one, not on what the client sent
+REST_FRAMEWORK = dict(
+    REST_FRAMEWORK,  # noqa: F405
+    DEFAULT_RENDERER_CLASSES=REST_FRAMEWORK[  # noqa: F405
+        'DEFAULT_RENDERER_CLASSES'
+    ][:1],
+    NUM_PROXIES=int(os.environ.get('NUM_PROXIES', 1)),
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': os.environ.get('LOG_LEVEL', 'INFO'),
+    },
+    'loggers': {
+        'django.db.backends': {'level': 'WARNING'},
+    },
+}
@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save, pre_save
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from core.db import check_connections
+        from core.models import Recipe
+        from core.storage import remember_image, count_image, \
+            uncount_image
+
+        pre_save.connect(remember_image, sender=Recipe)
+        post_save.connect(count_image, sender=Recipe)
+        post_delete.connect(uncount_image, sender=Recipe)
+        request_started.connect(check_connections)
@@ -0,0 +1,75 @@
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import Error, extensions
+
+from core.db import ConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def ping(connection):
+    """TRUE IF THE RAW connection STILL ANSWERS A QUERY"""
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        if connection.get_transaction_status() != \
+                extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+    except Error:
+        return False
+    return True
+
+
+def reset(connection):
+    """ROLL BACK WHAT A REQUEST LEFT OPEN, FALSE IF connection IS BROKEN"""
+    if connection.closed:
+        return False
+    try:
+        if connection.get_transaction_status() != \
+                extensions.TRANSACTION_STATUS_IDLE:
+            connection.rollback()
+    except Error:
+        return False
+    return True
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """POSTGRESQL BACKEND SHARING A POOL OF CONNECTIONS BETWEEN THREADS
+
+    Closing the connection, which Django does at the end of every
+    request when CONN_MAX_AGE is 0, gives it back to a pool shared by
+    the threads of the process instead of closing it. Extra settings:
+    POOL_SIZE, the most connections the process opens, and
+    POOL_TIMEOUT, the seconds a thread waits for a free one.
+    """
+
+    def get_pool(self, conn_params):
+        key = repr(sorted(conn_params.items()))
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = ConnectionPool(
+                    lambda: base.Database.connect(**conn_params),
+                    self.settings_dict.get('POOL_SIZE') or 10,
+                    self.settings_dict.get('POOL_TIMEOUT', 10),
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        check = self.settings_dict.get('CONN_HEALTH_CHECKS')
+        connection = self.pool.get(usable=ping if check else None)
+
+        # what the parent does to a connection it just opened
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            self.pool.put(self.connection, reusable=reset(self.connection))
@@ -0,0 +1,83 @@
+import queue
+import threading
+
+from django.db import connections
+from django.db.utils import OperationalError
+
+
+def check_connections(**kwargs):
+    """CLOSE PERSISTENT CONNECTIONS THAT DIED BETWEEN TWO REQUESTS
+
+    Connected to request_started, after Django closed the obsolete
+    ones. Only databases with CONN_HEALTH_CHECKS are pinged, so a
+    request never runs its first query on a connection the server or
+    a proxy dropped while it sat idle.
+    """
+    for conn in connections.all():
+        if conn.connection is None or conn.in_atomic_block:
+            continue
+        if conn.settings_dict.get('CONN_HEALTH_CHECKS') \
+                and not conn.is_usable():
+            conn.close()
+
+
+class ConnectionPool:
+    """BOUNDED POOL OF OPEN DB-API CONNECTIONS SHARED BY THREADS
+
+    At most ``size`` connections are checked out at once, get() waits
+    up to ``timeout`` seconds for one to be put back. Idle connections
+    are reused most recently used first, so the rest can time out on
+    the server side.
+    """
+
+    def __init__(self, connect, size, timeout):
+        self.connect = connect
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def get(self, usable=None):
+        """CHECK OUT AN IDLE CONNECTION, OR OPEN ONE IF NONE IS IDLE
+
+        Idle connections failing ``usable(connection)`` are dropped.
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise OperationalError(
+                f"No database connection was free within {self.timeout}s"
+            )
+        try:
+            while True:
+                try:
+                    connection = self._idle.get_nowait()
+                except queue.Empty:
+                    return self.connect()
+                if usable is None or usable(connection):
+                    return connection
+                self.discard(connection)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def put(self, connection, reusable=True):
+        """GIVE BACK A CHECKED OUT CONNECTION, CLOSING IT IF NOT reusable"""
+        try:
+            if reusable:
+                self._idle.put_nowait(connection)
+            else:
+                self.discard(connection)
+        finally:
+            self._slots.release()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """CLOSE EVERY IDLE CONNECTION"""
+        while True:
+            try:
+                self.discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
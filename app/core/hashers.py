@@ -0,0 +1,109 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many logins at once, try again shortly."
+    default_code = 'hashing_busy'
+
+
+class HashingPool:
+    """BOUNDED POOL OF THREADS THE PASSWORD HASHES ARE COMPUTED ON
+
+    Caps the CPU a worker process spends hashing at ``workers`` cores,
+    so a login spike can't starve the requests sharing the process.
+    At most ``admitted`` hashes, running or queued, are taken at once;
+    kept below the request threads of the process, the others always
+    have threads left. Past it, or when a hash is still queued after
+    ``timeout`` seconds, HashingBusy is raised instead.
+    """
+
+    def __init__(self, workers, timeout, admitted=None):
+        self.timeout = timeout
+        self._admitted = threading.BoundedSemaphore(admitted or workers)
+        self._local = threading.local()
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='password-hash',
+            initializer=self._mark_thread,
+        )
+
+    def _mark_thread(self):
+        self._local.in_pool = True
+
+    def run(self, func, *args):
+        # hashers call each other, e.g. verify() encodes
+        if getattr(self._local, 'in_pool', False):
+            return func(*args)
+        # never wait for a slot, the request thread would be held
+        if not self._admitted.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            self._admitted.release()
+            raise
+        # freed once the hash is done, a running one can't be cancelled
+        future.add_done_callback(lambda future: self._admitted.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashingBusy()
+
+
+pool = HashingPool(
+    settings.PASSWORD_HASHING['WORKERS'],
+    settings.PASSWORD_HASHING['TIMEOUT'],
+    settings.PASSWORD_HASHING['ADMITTED'],
+)
+
+
+class PooledHasherMixin:
+    """COMPUTE THE HASHES OF A DJANGO HASHER ON THE HASHING POOL"""
+
+    def encode(self, password, salt, *args):
+        return pool.run(super().encode, password, salt, *args)
+
+    def verify(self, password, encoded):
+        return pool.run(super().verify, password, encoded)
+
+
+class Argon2PasswordHasher(PooledHasherMixin,
+                           hashers.Argon2PasswordHasher):
+    """ARGON2 WITH THE COSTS OF settings.PASSWORD_HASHING
+
+    Changing a cost makes must_update() true for the older hashes, so
+    they are rehashed at the next login.
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_HASHING['ARGON2_TIME_COST']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_HASHING['ARGON2_MEMORY_COST']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASHING['ARGON2_PARALLELISM']
+
+
+class BCryptSHA256PasswordHasher(PooledHasherMixin,
+                                 hashers.BCryptSHA256PasswordHasher):
+    """BCRYPT WITH THE ROUNDS OF settings.PASSWORD_HASHING"""
+
+    @property
+    def rounds(self):
+        return settings.PASSWORD_HASHING['BCRYPT_ROUNDS']
+
+
+class PBKDF2PasswordHasher(PooledHasherMixin,
+                           hashers.PBKDF2PasswordHasher):
+    """VERIFIES THE PBKDF2 HASHES STORED BEFORE ARGON2 WAS THE DEFAULT"""
@@ -0,0 +1,90 @@
+import os
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from core.models import ImageBlob, Recipe
+
+IMAGE_DIR = 'uploads/recipe'
+
+
+def file_key(name):
+    """(DIRECTORY, STEM) SHARED BY AN IMAGE AND ITS DERIVED FILES"""
+    directory, basename = os.path.split(name)
+    stem = os.path.splitext(basename)[0].split('_')[0]
+    return directory, stem
+
+
+class Command(BaseCommand):
+    """DJANGO COMMAND TO DELETE RECIPE IMAGES NO RECIPE REFERENCES"""
+    help = "Recount image references and delete unreferenced image files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only report what would be deleted.")
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help="Keep files younger than this, they may "
+                                 "belong to an upload in flight.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+        storage = Recipe._meta.get_field('img').storage
+
+        counts = dict(
+            Recipe.objects.exclude(img__isnull=True).exclude(img='')
+            .values_list('img').annotate(refcount=Count('id'))
+        )
+        repaired = self.recount(counts, dry_run)
+        referenced = {file_key(name) for name in counts}
+
+        deleted, freed = 0, 0
+        root = storage.path(IMAGE_DIR)
+        for directory, _, files in os.walk(root):
+            for filename in files:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, storage.location) \
+                    .replace(os.sep, '/')
+                if file_key(name) in referenced:
+                    continue
+                modified = storage.get_modified_time(name)
+                if modified >= cutoff:
+                    continue
+                deleted += 1
+                freed += storage.size(name)
+                if not dry_run:
+                    storage.delete(name)
+
+        stale = ImageBlob.objects.filter(refcount=0, created_at__lt=cutoff)
+        if not dry_run:
+            stale.delete()
+
+        prefix = "Would delete" if dry_run else "Deleted"
+        self.stdout.write(
+            f"Repaired {repaired} reference counts. "
+            f"{prefix} {deleted} files ({freed} bytes)."
+        )
+
+    def recount(self, counts, dry_run):
+        """SYNC ImageBlob.refcount WITH THE RECIPES, COUNT THE FIXES"""
+        repaired = 0
+        known = set()
+        for blob in ImageBlob.objects.all().iterator():
+            known.add(blob.name)
+            refcount = counts.get(blob.name, 0)
+            if blob.refcount != refcount:
+                repaired += 1
+                if not dry_run:
+                    ImageBlob.objects.filter(pk=blob.pk) \
+                        .update(refcount=refcount)
+
+        missing = [
+            ImageBlob(name=name, refcount=refcount)
+            for name, refcount in counts.items() if name not in known
+        ]
+        repaired += len(missing)
+        if not dry_run:
+            ImageBlob.objects.bulk_create(missing)
+        return repaired
@@ -0,0 +1,87 @@
+# Generated by Django 2.1.15 on 2026-10-18 04:45
+
+import core.models
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+from django.conf import settings
+
+# Written out rather than taken from core.search, which follows the
+# current models: this migration must keep doing what it did
+
+
+def names(relation, aggregate):
+    """SQL FOR THE JOINED NAMES OF A RECIPE'S TAGS OR INGREDIENTS"""
+    return (
+        f"(SELECT {aggregate}(r.name, ' ') "
+        f"FROM core_recipe_{relation}s l "
+        f"JOIN core_{relation} r ON r.id = l.{relation}_id "
+        f"WHERE l.recipe_id = core_recipe.id)"
+    )
+
+
+def build_search_index(apps, schema_editor):
+    """GIN INDEX ON POSTGRESQL, THE FTS5 TABLE ON SQLITE, THEN BACKFILL"""
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                "CREATE INDEX recipe_search_vector_idx "
+                "ON core_recipe USING gin (search_vector)"
+            )
+            cursor.execute(
+                f"UPDATE core_recipe SET search_vector = "
+                f"setweight(to_tsvector(%s::regconfig, title), 'A') || "
+                f"setweight(to_tsvector(%s::regconfig, "
+                f"coalesce({names('tag', 'string_agg')}, '')), 'B') || "
+                f"setweight(to_tsvector(%s::regconfig, "
+                f"coalesce({names('ingredient', 'string_agg')}, '')), 'C')",
+                [settings.SEARCH_CONFIG] * 3
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                "CREATE VIRTUAL TABLE recipe_search "
+                "USING fts5(title, tags, ingredients, "
+                "tokenize = 'porter unicode61 remove_diacritics 1')"
+            )
+            cursor.execute(
+                f"INSERT INTO recipe_search (rowid, title, tags, ingredients) "
+                f"SELECT id, title, {names('tag', 'group_concat')}, "
+                f"{names('ingredient', 'group_concat')} FROM core_recipe"
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("DROP INDEX IF EXISTS recipe_search_vector_idx")
+        elif connection.vendor == 'sqlite':
+            cursor.execute("DROP TABLE IF EXISTS recipe_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_version_stamps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='RecipeSearchEntry',
+            fields=[
+                ('recipe', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='core.Recipe')),
+                ('document', core.models.FullTextField(db_column='recipe_search')),
+            ],
+            options={
+                'db_table': 'recipe_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(build_search_index, drop_search_index),
+    ]
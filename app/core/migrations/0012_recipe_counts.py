@@ -0,0 +1,55 @@
+# Generated by Django 2.1.15 on 2026-10-18 04:49
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_recipes(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    for field_name in ('tags', 'ingredients'):
+        field = Recipe._meta.get_field(field_name)
+        model = field.related_model
+        column = model._meta.model_name
+        links = field.remote_field.through.objects \
+            .filter(**{column: models.OuterRef('pk')}) \
+            .order_by().values(column) \
+            .annotate(count=models.Count('pk')).values('count')
+        model.objects.update(recipe_count=Coalesce(
+            models.Subquery(links, output_field=models.IntegerField()), 0
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_name_suggest_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_recipes, migrations.RunPython.noop),
+        # partial indexes: ?assigned_only=1 lists are a range scan over
+        # the user's used rows, already in list order
+        migrations.RunSQL(
+            [
+                "CREATE INDEX tag_assigned_name_id_idx ON core_tag "
+                "(user_id, name DESC, id) WHERE recipe_count > 0",
+                "CREATE INDEX ingredient_assigned_name_id_idx "
+                "ON core_ingredient "
+                "(user_id, name DESC, id) WHERE recipe_count > 0",
+            ],
+            [
+                "DROP INDEX tag_assigned_name_id_idx",
+                "DROP INDEX ingredient_assigned_name_id_idx",
+            ],
+        ),
+    ]
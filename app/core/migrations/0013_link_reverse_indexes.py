@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_recipe_counts'),
+    ]
+
+    # the auto-created through tables only get a (recipe_id, x_id) unique
+    # index; the tag/ingredient filters look links up from the other side
+    operations = [
+        migrations.RunSQL(
+            [
+                "CREATE INDEX recipe_tags_tag_recipe_idx "
+                "ON core_recipe_tags (tag_id, recipe_id)",
+                "CREATE INDEX recipe_ingredients_ingredient_recipe_idx "
+                "ON core_recipe_ingredients (ingredient_id, recipe_id)",
+            ],
+            [
+                "DROP INDEX recipe_tags_tag_recipe_idx",
+                "DROP INDEX recipe_ingredients_ingredient_recipe_idx",
+            ],
+        ),
+    ]
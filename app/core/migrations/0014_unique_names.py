@@ -0,0 +1,85 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Lower
+
+
+def merge_duplicates(apps, schema_editor):
+    """KEEP THE OLDEST ROW PER (USER, LOWER(NAME)), MOVING LINKS TO IT"""
+    Recipe = apps.get_model('core', 'Recipe')
+    for field_name in ('tags', 'ingredients'):
+        field = Recipe._meta.get_field(field_name)
+        model = field.related_model
+        through = field.remote_field.through
+        column = f"{model._meta.model_name}_id"
+
+        groups = model.objects.annotate(key=Lower('name')) \
+            .values('user_id', 'key') \
+            .annotate(rows=models.Count('id'), keep=models.Min('id')) \
+            .filter(rows__gt=1)
+        keepers = {
+            (group['user_id'], group['key']): group['keep']
+            for group in groups
+        }
+        if not keepers:
+            continue
+
+        merged = {}
+        for pk, user_id, key in model.objects \
+                .annotate(key=Lower('name')) \
+                .filter(user_id__in={user for user, _ in keepers}) \
+                .values_list('id', 'user_id', 'key').iterator():
+            keep = keepers.get((user_id, key))
+            if keep is not None and keep != pk:
+                merged[pk] = keep
+
+        links = set(
+            through.objects.filter(**{
+                f"{column}__in": set(merged.values())
+            }).values_list('recipe_id', column)
+        )
+        moved = {
+            (recipe_id, merged[pk])
+            for recipe_id, pk in through.objects.filter(**{
+                f"{column}__in": merged
+            }).values_list('recipe_id', column)
+        } - links
+        through.objects.filter(**{f"{column}__in": merged}).delete()
+        through.objects.bulk_create(
+            through(**{'recipe_id': recipe_id, column: pk})
+            for recipe_id, pk in moved
+        )
+        model.objects.filter(pk__in=merged).delete()
+
+        counts = through.objects \
+            .filter(**{column: models.OuterRef('pk')}) \
+            .order_by().values(column) \
+            .annotate(count=models.Count('pk')).values('count')
+        model.objects.filter(pk__in=set(merged.values())).update(
+            recipe_count=Coalesce(
+                models.Subquery(counts,
+                                output_field=models.IntegerField()), 0
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_link_reverse_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        # case-normalized uniqueness, the conflict target of upsert()
+        migrations.RunSQL(
+            [
+                "CREATE UNIQUE INDEX tag_user_lower_name_uniq "
+                "ON core_tag (user_id, LOWER(name))",
+                "CREATE UNIQUE INDEX ingredient_user_lower_name_uniq "
+                "ON core_ingredient (user_id, LOWER(name))",
+            ],
+            [
+                "DROP INDEX tag_user_lower_name_uniq",
+                "DROP INDEX ingredient_user_lower_name_uniq",
+            ],
+        ),
+    ]
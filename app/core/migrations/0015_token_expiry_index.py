@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authtoken', '0002_auto_20160226_1747'),
+        ('core', '0014_unique_names'),
+    ]
+
+    operations = [
+        # Token.created is the last renewal: expiry sweeps are a range
+        # scan instead of a full one
+        migrations.RunSQL(
+            ["CREATE INDEX authtoken_token_created_idx "
+             "ON authtoken_token (created)"],
+            ["DROP INDEX authtoken_token_created_idx"],
+        ),
+    ]
@@ -1,10 +1,17 @@
 import uuid
 import os
+from itertools import islice
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, \
     BaseUserManager, PermissionsMixin
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models, router
+from django.db.models import prefetch_related_objects
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from core.storage import image_storage
 
 
 def recipe_image_file_path(instance, file_name):
@@ -53,12 +60,79 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
 
 
+class RecipeAttrQuerySet(models.QuerySet):
+    """QUERIES SHARED BY TAGS AND INGREDIENTS"""
+
+    def assigned(self):
+        """ONLY ROWS USED BY A RECIPE, SERVED BY A PARTIAL INDEX"""
+        return self.filter(recipe_count__gt=0)
+
+    def refresh_recipe_counts(self):
+        """RECOUNT THE RECIPES LINKED TO EACH ROW OF THE QUERYSET"""
+        through = self.model._meta.get_field('recipe').through
+        column = self.model._meta.model_name
+        links = through.objects.filter(**{column: models.OuterRef('pk')}) \
+            .order_by().values(column) \
+            .annotate(count=models.Count('pk')).values('count')
+        return self.update(recipe_count=Coalesce(
+            models.Subquery(links, output_field=models.IntegerField()), 0
+        ))
+
+    def upsert(self, user, names):
+        """GET OR CREATE THE USER'S ROWS NAMED names, IN ONE STATEMENT
+
+        Names match case-insensitively, an existing row keeps its
+        spelling. Relies on the unique (user_id, LOWER(name)) index via
+        INSERT ... ON CONFLICT, so concurrent calls never duplicate a
+        row. Returns the rows aligned with names; no signals are sent.
+        """
+        if not names:
+            return []
+        spellings = {}
+        for name in names:
+            spellings.setdefault(name.lower(), name)
+
+        table = self.model._meta.db_table
+        connection = connections[router.db_for_write(self.model)]
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        params = []
+        for name in spellings.values():
+            params += [user.pk, name, now]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} "
+                f"(user_id, name, updated_at, recipe_count) "
+                f"VALUES {', '.join(['(%s, %s, %s, 0)'] * len(spellings))} "
+                f"ON CONFLICT (user_id, LOWER(name)) "
+                f"DO UPDATE SET name = {table}.name "
+                f"RETURNING id, name, recipe_count",
+                params
+            )
+            rows = {
+                name.lower(): self.model(id=pk, user=user, name=name,
+                                         recipe_count=recipe_count)
+                for pk, name, recipe_count in cursor.fetchall()
+            }
+        return [rows[name.lower()] for name in names]
+
+
 class Tag(models.Model):
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # recipes using the tag, kept by recipe.signals
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-name', 'id'],
+                         name='tag_user_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -70,12 +144,77 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
     )
+    updated_at = models.DateTimeField(auto_now=True)
+    # recipes using the ingredient, kept by recipe.signals
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = RecipeAttrQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-name', 'id'],
+                         name='ingredient_user_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """QUERY PLANS FOR THE RECIPE ENDPOINTS"""
+    LIST_FIELDS = ("id", "title", "time_minutes", "price", "link")
+
+    def for_list(self):
+        """ONLY THE LIST COLUMNS, RELATED IDS PREFETCHED IN BULK"""
+        return self.only(*self.LIST_FIELDS).prefetch_related(
+            models.Prefetch('tags', queryset=Tag.objects.only('id')),
+            models.Prefetch(
+                'ingredients', queryset=Ingredient.objects.only('id')
+            ),
+        )
+
+    def for_detail(self):
+        """NESTED TAGS AND INGREDIENTS PREFETCHED IN BULK"""
+        return self.defer('search_vector').prefetch_related(
+            models.Prefetch(
+                'tags',
+                queryset=Tag.objects.only('id', 'name', 'recipe_count')
+            ),
+            models.Prefetch(
+                'ingredients',
+                queryset=Ingredient.objects.only(
+                    'id', 'name', 'recipe_count'
+                )
+            ),
+        )
+
+    def chunks(self, size):
+        """YIELD LISTS OF size RECIPES READ THROUGH ONE SERVER-SIDE CURSOR
+
+        iterator() skips prefetch_related, so the lookups are done for
+        each chunk instead: memory stays at one chunk whatever the
+        number of recipes.
+        """
+        lookups = self._prefetch_related_lookups
+        rows = self.prefetch_related(None).iterator(chunk_size=size)
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                return
+            prefetch_related_objects(chunk, *lookups)
+            yield chunk
+
+
 class Recipe(models.Model):
+    IMG_PENDING = 'pending'
+    IMG_READY = 'ready'
+    IMG_FAILED = 'failed'
+    IMG_STATUS_CHOICES = (
+        (IMG_PENDING, 'Pending'),
+        (IMG_READY, 'Ready'),
+        (IMG_FAILED, 'Failed'),
+    )
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE
@@ -87,7 +226,81 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
-    img = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    img = models.ImageField(null=True, upload_to=recipe_image_file_path,
+                            storage=image_storage)
+    img_status = models.CharField(max_length=10, blank=True,
+                                  choices=IMG_STATUS_CHOICES)
+    updated_at = models.DateTimeField(auto_now=True)
+    # maintained by core.search, GIN indexed on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-id'],
+                         name='recipe_user_id_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class FullTextMatch(models.Lookup):
+    """<field>__match=QUERY, A MATCH CONSTRAINT ON AN FTS5 TABLE"""
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class FullTextField(models.TextField):
+    """THE HIDDEN COLUMN, NAMED AFTER ITS TABLE, OF AN FTS5 TABLE"""
+
+
+FullTextField.register_lookup(FullTextMatch)
+
+
+class RecipeSearchEntry(models.Model):
+    """ENTRY OF THE FTS5 TABLE INDEXING RECIPES ON SQLITE
+
+    The table is created and kept up to date by core.search.
+    """
+    recipe = models.OneToOneField(
+        Recipe, primary_key=True, db_column='rowid',
+        on_delete=models.DO_NOTHING, related_name='search_entry'
+    )
+    document = FullTextField(db_column='recipe_search')
+
+    class Meta:
+        managed = False
+        db_table = 'recipe_search'
+
+
+class CollectionVersion(models.Model):
+    """VERSION OF ONE KIND OF A USER'S DATA, BUMPED ON EVERY WRITE"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE
+    )
+    kind = models.CharField(max_length=20)
+    version = models.BigIntegerField()
+    modified_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = (('user', 'kind'),)
+
+    def __str__(self):
+        return f"{self.kind} v{self.version}"
+
+
+class ImageBlob(models.Model):
+    """A STORED IMAGE FILE AND THE NUMBER OF RECIPES USING IT"""
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
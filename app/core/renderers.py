@@ -0,0 +1,51 @@
+import orjson
+from django.conf import settings
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+# DRF's own rendering of what JSON has no type for: Decimal, dates and
+# times (passed through so they keep DRF's format), lazy strings, ...
+OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+default = encoders.JSONEncoder().default
+
+
+class ORJSONRenderer(renderers.JSONRenderer):
+    """JSONRenderer ON ORJSON, SAME BYTES OUT SEVERAL TIMES FASTER
+
+    Compact UTF-8 output, as the JSONRenderer gives with the default
+    COMPACT_JSON and UNICODE_JSON. Indented or ASCII output is left to
+    the JSONRenderer. NaN and infinite floats render as null instead of
+    failing.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+
+        indent = self.get_indent(accepted_media_type,
+                                 renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        ret = orjson.dumps(data, default=default, option=OPTIONS)
+        # kept a javascript subset, as the JSONRenderer does
+        return ret.replace('\u2028'.encode(), b'\\u2028') \
+            .replace('\u2029'.encode(), b'\\u2029')
+
+
+class ORJSONParser(parsers.JSONParser):
+    """JSONParser ON ORJSON, FOR UTF-8 BODIES"""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if encoding.lower().replace('-', '') != 'utf8' or not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % exc)
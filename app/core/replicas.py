@@ -0,0 +1,85 @@
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+_state = threading.local()
+
+
+def replica_for_reads():
+    """ALIAS THE CURRENT THREAD READS FROM, NONE FOR THE PRIMARY"""
+    return getattr(_state, 'replica', None)
+
+
+def pin_cache():
+    return caches[settings.REPLICA_ROUTING['CACHE_ALIAS']]
+
+
+def pin_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    """READ THE USER'S DATA FROM THE PRIMARY FOR STICKY_SECONDS"""
+    pin_cache().set(pin_key(user_id), True,
+                    settings.REPLICA_ROUTING['STICKY_SECONDS'])
+
+
+def is_pinned(user_id):
+    return pin_cache().get(pin_key(user_id), False)
+
+
+class ReplicaRouter:
+    """SEND THE READS OF REPLICA SAFE REQUESTS TO settings.DATABASE_REPLICAS
+
+    Writes always go to the primary, also for rows read from a replica.
+    Replicas are copies of the primary, so they are never migrated.
+    """
+
+    def db_for_read(self, model, **hints):
+        return replica_for_reads()
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None \
+                and instance._state.db in settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """SERVE THE SAFE-METHOD REQUESTS OF A VIEW FROM A READ REPLICA
+
+    Reads stay on the primary for a while after the user wrote through
+    one of these views, so they see their own writes despite the lag.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # after authentication, stickiness is per user
+        if settings.DATABASE_REPLICAS \
+                and request.method in SAFE_METHODS \
+                and not is_pinned(request.user.pk):
+            _state.replica = random.choice(settings.DATABASE_REPLICAS)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        _state.replica = None
+        if settings.DATABASE_REPLICAS \
+                and request.method not in SAFE_METHODS \
+                and request.user.is_authenticated:
+            pin_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,187 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, \
+    TrigramSimilarity
+from django.db import connections, router
+from django.db.models import BigIntegerField, F, FloatField, Func, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+
+from core.models import Recipe, RecipeSearchEntry
+
+# FTS5 table shadowing core_recipe on sqlite, keyed by rowid = recipe id
+FTS_TABLE = RecipeSearchEntry._meta.db_table
+# Relative weight of the title, tag and ingredient names in the ranking
+FTS_WEIGHTS = (10.0, 4.0, 2.0)
+# Ranks are integers, scaled by this: the search cursor is the rank of
+# the last hit as text, a float doesn't survive the round trip exactly
+RANK_SCALE = 10 ** 9
+# sqlite caps the number of bound parameters per statement
+SQLITE_BATCH = 500
+
+
+def names_sql(field_name, aggregate):
+    """SQL FOR THE JOINED NAMES OF A RECIPE'S TAGS OR INGREDIENTS"""
+    field = Recipe._meta.get_field(field_name)
+    return (
+        f"(SELECT {aggregate}(r.name, ' ') "
+        f"FROM {field.m2m_db_table()} l "
+        f"JOIN {field.related_model._meta.db_table} r "
+        f"ON r.id = l.{field.m2m_reverse_name()} "
+        f"WHERE l.{field.m2m_column_name()} = {Recipe._meta.db_table}.id)"
+    )
+
+
+class NameOrder(Func):
+    """CASE-INSENSITIVE NAME ORDER, AS KEPT BY THE PREFIX INDEX
+
+    Lets the index return the first names without sorting every match.
+    """
+    function = 'UPPER'
+
+    def as_postgresql(self, compiler, connection):
+        return self.as_sql(
+            compiler, connection,
+            template='UPPER(%(expressions)s::text) COLLATE "C"'
+        )
+
+    def as_sqlite(self, compiler, connection):
+        return self.as_sql(
+            compiler, connection,
+            template='%(expressions)s COLLATE NOCASE'
+        )
+
+
+def suggest_names(queryset, q, limit):
+    """UP TO limit ROWS OF queryset FOR AUTOCOMPLETING q
+
+    Names starting with q come first, alphabetically. The rest are
+    filled with similar names: by trigram similarity on PostgreSQL,
+    names containing q elsewhere on sqlite.
+    """
+    matches = list(
+        queryset.filter(name__istartswith=q)
+        .order_by(NameOrder('name'), 'id')
+        [:limit]
+    )
+    if len(matches) == limit:
+        return matches
+
+    if connections[queryset.db].vendor == 'postgresql':
+        similar = queryset.filter(name__trigram_similar=q) \
+            .annotate(similarity=TrigramSimilarity('name', q)) \
+            .order_by('-similarity', 'id')
+    else:
+        similar = queryset.filter(name__icontains=q) \
+            .order_by(NameOrder('name'), 'id')
+    return matches + list(
+        similar.exclude(pk__in=[match.pk for match in matches])
+        [:limit - len(matches)]
+    )
+
+
+def index_recipes(ids=None, using=None):
+    """REFRESH THE SEARCH DOCUMENT OF THE GIVEN RECIPES, OR OF ALL
+
+    Ids of deleted recipes may be passed, their entries are dropped.
+    """
+    connection = connections[using or router.db_for_write(Recipe)]
+    if ids is not None:
+        ids = list(ids)
+        if not ids:
+            return
+    if connection.vendor == 'postgresql':
+        index_postgresql(connection, ids)
+    elif connection.vendor == 'sqlite':
+        if ids is None:
+            index_sqlite(connection, None)
+        for start in range(0, len(ids or ()), SQLITE_BATCH):
+            index_sqlite(connection, ids[start:start + SQLITE_BATCH])
+
+
+def index_postgresql(connection, ids):
+    config = settings.SEARCH_CONFIG
+    sql = (
+        f"UPDATE {Recipe._meta.db_table} SET search_vector = "
+        f"setweight(to_tsvector(%s::regconfig, title), 'A') || "
+        f"setweight(to_tsvector(%s::regconfig, "
+        f"coalesce({names_sql('tags', 'string_agg')}, '')), 'B') || "
+        f"setweight(to_tsvector(%s::regconfig, "
+        f"coalesce({names_sql('ingredients', 'string_agg')}, '')), 'C')"
+    )
+    params = [config, config, config]
+    if ids is not None:
+        sql += " WHERE id = ANY(%s)"
+        params.append(ids)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def index_sqlite(connection, ids):
+    delete_where, insert_where, params = "", "", []
+    if ids is not None:
+        placeholders = ', '.join(['%s'] * len(ids))
+        delete_where = f" WHERE rowid IN ({placeholders})"
+        insert_where = f" WHERE id IN ({placeholders})"
+        params = ids
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}" + delete_where, params)
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, title, tags, ingredients) "
+            f"SELECT id, title, "
+            f"{names_sql('tags', 'group_concat')}, "
+            f"{names_sql('ingredients', 'group_concat')} "
+            f"FROM {Recipe._meta.db_table}" + insert_where,
+            params
+        )
+
+
+def linked_recipe_ids(model, pks):
+    """IDS OF THE RECIPES WHOSE SEARCH DOCUMENT INCLUDES THE GIVEN ROWS"""
+    if model is Recipe:
+        return list(pks)
+    for field in Recipe._meta.many_to_many:
+        if field.related_model is model:
+            return list(
+                Recipe.objects.filter(**{f"{field.name}__in": pks})
+                .values_list('id', flat=True).distinct()
+            )
+    return []
+
+
+def scaled(rank):
+    """A FLOAT rank AS AN INTEGER, COMPUTED THE SAME BY EVERY QUERY"""
+    return Cast(rank * Value(RANK_SCALE, output_field=FloatField()),
+                BigIntegerField())
+
+
+def search_recipes(queryset, q):
+    """FILTER queryset TO RECIPES MATCHING q, ANNOTATED WITH A rank
+
+    Higher ranks are better matches. The rank is an integer, so the
+    pages of a ('-rank', '-id') keyset never repeat or skip a hit.
+    """
+    words = re.findall(r'\w+', q)
+    if not words:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = SearchQuery(' '.join(words), config=settings.SEARCH_CONFIG)
+        return queryset.annotate(
+            rank=scaled(SearchRank(F('search_vector'), query))
+        ).filter(search_vector=query)
+
+    if vendor == 'sqlite':
+        # quoted terms so user input is never read as FTS5 syntax
+        match = ' '.join(f'"{word}"' for word in words)
+        weights = ', '.join(str(weight) for weight in FTS_WEIGHTS)
+        # joined on rowid, so the match runs once for the whole query
+        return queryset.filter(search_entry__document__match=match) \
+            .annotate(rank=scaled(RawSQL(
+                f"-bm25({FTS_TABLE}, {weights})", (),
+                output_field=FloatField()
+            )))
+
+    raise NotImplementedError(f"Recipe search is not supported on {vendor}")
@@ -0,0 +1,143 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+# <sha256>.<ext>, or a derived file such as <sha256>_small.webp
+CONTENT_NAME = re.compile(r'^[0-9a-f]{64}(_\w+)?\.\w+$')
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FILE SYSTEM STORAGE THAT STORES EACH DISTINCT CONTENT ONCE
+
+    New files are renamed to <dir>/<sha[:2]>/<sha>.<ext>; saving content
+    that is already stored returns the existing name without writing.
+    Names that are already content addresses are written verbatim so
+    derived files (variants, re-encodes) keep their names. A name is
+    the hash of the content as uploaded, a re-encode keeps it so the
+    same upload still finds it.
+    """
+
+    @staticmethod
+    def content_name(name, digest):
+        ext = os.path.splitext(name)[1].lower()
+        return os.path.join(os.path.dirname(name), digest[:2], digest + ext)
+
+    @staticmethod
+    def is_content_name(name):
+        return bool(CONTENT_NAME.match(os.path.basename(name)))
+
+    def _save(self, name, content):
+        if self.is_content_name(name):
+            return super()._save(name, content)
+
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        name = self.content_name(name, digest.hexdigest())
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+    def replace(self, name, data):
+        """WRITE data AT name IN ONE STEP, WHETHER OR NOT name EXISTS
+
+        Written to a temporary file renamed over name, so readers of a
+        shared file see the old content or the new, never no file.
+        """
+        path = self.path(name)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            else:
+                # mkstemp creates it private, as a default save wouldn't
+                umask = os.umask(0)
+                os.umask(umask)
+                os.chmod(tmp_path, 0o666 & ~umask)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def adopt(self, name, digest):
+        """MOVE A FILE ALREADY WRITTEN AT name TO ITS CONTENT ADDRESS
+
+        Returns (final_name, created); created is False when the content
+        was already stored and the file at name was discarded.
+        """
+        final_name = self.content_name(name, digest)
+        if self.exists(final_name):
+            self.delete(name)
+            return final_name, False
+
+        final_path = self.path(final_name)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(self.path(name), final_path)
+        return final_name, True
+
+
+image_storage = ContentAddressedStorage()
+
+
+def retain_image(name):
+    """COUNT ONE MORE RECIPE REFERENCING THE IMAGE AT name"""
+    from core.models import ImageBlob
+
+    if not name:
+        return
+    updated = ImageBlob.objects.filter(name=name) \
+        .update(refcount=F('refcount') + 1)
+    if not updated:
+        ImageBlob.objects.create(name=name, refcount=1)
+
+
+def release_image(name):
+    """COUNT ONE LESS RECIPE REFERENCING THE IMAGE AT name
+
+    Unreferenced files are left for the gc_images command, which can
+    recheck them against the recipes before deleting anything.
+    """
+    from core.models import ImageBlob
+
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name, refcount__gt=0) \
+        .update(refcount=F('refcount') - 1)
+
+
+def remember_image(sender, instance, **kwargs):
+    """pre_save: NOTE WHICH IMAGE THE ROW REFERENCED BEFORE THIS SAVE"""
+    update_fields = kwargs.get('update_fields')
+    instance._stored_img = instance.img.name
+    if kwargs.get('raw') or (update_fields and 'img' not in update_fields):
+        return
+    instance._stored_img = None
+    if instance.pk:
+        instance._stored_img = sender.objects.filter(pk=instance.pk) \
+            .values_list('img', flat=True).first()
+
+
+def count_image(sender, instance, **kwargs):
+    """post_save: MOVE THE REFERENCE FROM THE OLD IMAGE TO THE NEW ONE"""
+    if kwargs.get('raw'):
+        return
+    old, new = getattr(instance, '_stored_img', None), instance.img.name
+    if old != new:
+        release_image(old)
+        retain_image(new)
+
+
+def uncount_image(sender, instance, **kwargs):
+    """post_delete: DROP THE DELETED ROW'S REFERENCE"""
+    release_image(instance.img.name)
@@ -1,9 +1,15 @@
+from io import StringIO
 from unittest.mock import patch
 
+from django.core.files.base import ContentFile
 from django.core.management import call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
 
+from core.models import ImageBlob, Recipe
+from core.storage import image_storage
+from core.tests.test_models import sample_user
+
 
 class ComandTest(TestCase):
     def test_wait_for_db_ready(self):
@@ -20,3 +26,42 @@ class ComandTest(TestCase):
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             self.assertEqual(gi.call_count, 6)
+
+
+class GcImagesCommandTest(TestCase):
+    def setUp(self) -> None:
+        self.kept = image_storage.save(
+            'uploads/recipe/kept.jpg', ContentFile(b'kept image')
+        )
+        self.orphan = image_storage.save(
+            'uploads/recipe/orphan.jpg', ContentFile(b'orphan image')
+        )
+        self.orphan_variant = image_storage.save(
+            self.orphan.replace('.jpg', '_small.webp'),
+            ContentFile(b'orphan variant')
+        )
+        Recipe.objects.create(
+            user=sample_user(), title="Kept", time_minutes=5, price=5.0,
+            img=self.kept
+        )
+        ImageBlob.objects.filter(name=self.kept).update(refcount=7)
+
+    def tearDown(self) -> None:
+        for name in (self.kept, self.orphan, self.orphan_variant):
+            image_storage.delete(name)
+
+    def test_gc_images(self):
+        """TEST THAT UNREFERENCED IMAGES AND THEIR VARIANTS ARE DELETED"""
+        call_command('gc_images', grace_minutes=-1, stdout=StringIO())
+
+        self.assertTrue(image_storage.exists(self.kept))
+        self.assertFalse(image_storage.exists(self.orphan))
+        self.assertFalse(image_storage.exists(self.orphan_variant))
+        self.assertEqual(ImageBlob.objects.get(name=self.kept).refcount, 1)
+
+    def test_gc_images_dry_run(self):
+        call_command('gc_images', grace_minutes=-1, dry_run=True,
+                     stdout=StringIO())
+
+        self.assertTrue(image_storage.exists(self.orphan))
+        self.assertEqual(ImageBlob.objects.get(name=self.kept).refcount, 7)
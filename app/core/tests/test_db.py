@@ -0,0 +1,201 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.db.utils import OperationalError
+from django.test import TestCase
+from psycopg2 import InterfaceError, extensions
+
+from core.backends.postgresql_pool import base
+from core.db import ConnectionPool, check_connections
+
+
+def raw_connection(**params):
+    """A STAND-IN FOR AN OPEN, IDLE PSYCOPG2 CONNECTION"""
+    conn = MagicMock(closed=0)
+    conn.get_transaction_status.return_value = \
+        extensions.TRANSACTION_STATUS_IDLE
+    return conn
+
+
+class ConnectionPoolTests(TestCase):
+
+    def setUp(self) -> None:
+        self.pool = ConnectionPool(MagicMock, size=2, timeout=0.01)
+
+    def test_reuses_returned_connection(self):
+        """TEST A CONNECTION PUT BACK IS CHECKED OUT AGAIN"""
+        first = self.pool.get()
+        self.pool.put(first)
+
+        self.assertIs(self.pool.get(), first)
+
+    def test_size_bounds_checked_out_connections(self):
+        """TEST get() TIMES OUT WHILE size CONNECTIONS ARE OUT"""
+        self.pool.get()
+        second = self.pool.get()
+
+        with self.assertRaises(OperationalError):
+            self.pool.get()
+
+        self.pool.put(second)
+        self.assertIs(self.pool.get(), second)
+
+    def test_waits_for_a_free_connection(self):
+        pool = ConnectionPool(MagicMock, size=1, timeout=5)
+        first = pool.get()
+        threading.Timer(0.05, pool.put, args=(first,)).start()
+
+        self.assertIs(pool.get(), first)
+
+    def test_unusable_connections_are_replaced(self):
+        first = self.pool.get()
+        self.pool.put(first)
+
+        second = self.pool.get(usable=lambda conn: False)
+
+        self.assertIsNot(second, first)
+        first.close.assert_called_once_with()
+
+    def test_broken_connection_not_reused(self):
+        first = self.pool.get()
+        self.pool.put(first, reusable=False)
+
+        self.assertIsNot(self.pool.get(), first)
+        first.close.assert_called_once_with()
+
+    def test_failed_connect_frees_its_slot(self):
+        pool = ConnectionPool(MagicMock(side_effect=OperationalError),
+                              size=1, timeout=0.01)
+        for _ in range(2):
+            with self.assertRaises(OperationalError):
+                pool.get()
+
+
+class PooledDatabaseWrapperTests(TestCase):
+
+    def setUp(self) -> None:
+        patcher = patch.dict(base._pools, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch.object(base.base.Database, 'connect',
+                               side_effect=raw_connection)
+        self.connect = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.params = {'database': 'app', 'host': 'db'}
+
+    def wrapper(self, **settings):
+        settings_dict = {'NAME': 'app', 'OPTIONS': {}, 'POOL_SIZE': 2,
+                         'POOL_TIMEOUT': 0.01}
+        settings_dict.update(settings)
+        return base.DatabaseWrapper(settings_dict)
+
+    def open(self, wrapper):
+        wrapper.connection = wrapper.get_new_connection(self.params)
+        return wrapper.connection
+
+    def test_closed_connection_returns_to_pool(self):
+        """TEST _close() GIVES THE CONNECTION TO THE NEXT WRAPPER"""
+        first = self.wrapper()
+        conn = self.open(first)
+        first._close()
+
+        self.assertIs(self.open(self.wrapper()), conn)
+        conn.close.assert_not_called()
+        self.connect.assert_called_once_with(**self.params)
+
+    def test_wrappers_share_pool_per_params(self):
+        first, second = self.wrapper(), self.wrapper()
+        self.open(first)
+        self.open(second)
+
+        self.assertIs(first.pool, second.pool)
+        self.assertIsNot(first.connection, second.connection)
+
+    def test_open_transaction_rolled_back_on_close(self):
+        wrapper = self.wrapper()
+        conn = self.open(wrapper)
+        conn.get_transaction_status.return_value = \
+            extensions.TRANSACTION_STATUS_INTRANS
+        wrapper._close()
+
+        conn.rollback.assert_called_once_with()
+        self.assertIs(self.open(self.wrapper()), conn)
+
+    def test_closed_connection_discarded(self):
+        """TEST A CONNECTION THE SERVER DROPPED IS NOT REUSED"""
+        wrapper = self.wrapper()
+        conn = self.open(wrapper)
+        conn.closed = 2
+        wrapper._close()
+
+        self.assertIsNot(self.open(self.wrapper()), conn)
+        conn.close.assert_called_once_with()
+
+    def test_failed_rollback_discarded(self):
+        wrapper = self.wrapper()
+        conn = self.open(wrapper)
+        conn.get_transaction_status.return_value = \
+            extensions.TRANSACTION_STATUS_INERROR
+        conn.rollback.side_effect = InterfaceError
+        wrapper._close()
+
+        self.assertIsNot(self.open(self.wrapper()), conn)
+        conn.close.assert_called_once_with()
+
+    def test_idle_connection_failing_health_check_discarded(self):
+        wrapper = self.wrapper(CONN_HEALTH_CHECKS=True)
+        conn = self.open(wrapper)
+        wrapper._close()
+        conn.cursor.return_value.__enter__.return_value.execute \
+            .side_effect = InterfaceError
+
+        self.assertIsNot(self.open(self.wrapper(CONN_HEALTH_CHECKS=True)),
+                         conn)
+        conn.close.assert_called_once_with()
+
+    def test_discarded_connection_frees_its_slot(self):
+        """TEST POOL_SIZE CONNECTIONS CAN STILL BE OPENED AFTERWARDS"""
+        wrapper = self.wrapper()
+        self.open(wrapper).closed = 2
+        wrapper._close()
+
+        self.open(self.wrapper())
+        self.open(self.wrapper())
+        with self.assertRaises(OperationalError):
+            self.open(self.wrapper())
+
+
+class CheckConnectionsTests(TestCase):
+
+    def test_dead_connection_closed(self):
+        """TEST A PERSISTENT CONNECTION FAILING ITS PING IS CLOSED"""
+        conn = MagicMock(in_atomic_block=False,
+                         settings_dict={'CONN_HEALTH_CHECKS': True})
+        conn.is_usable.return_value = False
+
+        with patch('core.db.connections') as connections:
+            connections.all.return_value = [conn]
+            check_connections()
+
+        conn.close.assert_called_once_with()
+
+    def test_checks_disabled(self):
+        conn = MagicMock(in_atomic_block=False, settings_dict={})
+
+        with patch('core.db.connections') as connections:
+            connections.all.return_value = [conn]
+            check_connections()
+
+        conn.is_usable.assert_not_called()
+        conn.close.assert_not_called()
+
+    def test_live_connection_kept(self):
+        conn = MagicMock(in_atomic_block=False,
+                         settings_dict={'CONN_HEALTH_CHECKS': True})
+        conn.is_usable.return_value = True
+
+        with patch('core.db.connections') as connections:
+            connections.all.return_value = [conn]
+            check_connections()
+
+        conn.close.assert_not_called()
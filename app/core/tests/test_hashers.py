@@ -0,0 +1,102 @@
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.test import TestCase, override_settings
+
+from core.hashers import HashingBusy, HashingPool
+
+
+class HashingPoolTests(TestCase):
+
+    def test_runs_on_pool_thread(self):
+        pool = HashingPool(workers=1, timeout=5)
+
+        name = pool.run(lambda: threading.current_thread().name)
+
+        self.assertTrue(name.startswith('password-hash'))
+
+    def test_nested_run_on_pool_thread(self):
+        """TEST A HASHER CALLING ANOTHER ON A FULL POOL DOESN'T DEADLOCK"""
+        pool = HashingPool(workers=1, timeout=1)
+
+        self.assertEqual(pool.run(pool.run, len, "hash"), 4)
+
+    def test_busy_pool_times_out(self):
+        """TEST A HASH WAITING LONGER THAN timeout IS DROPPED"""
+        pool = HashingPool(workers=1, timeout=0.05)
+        release = threading.Event()
+        pool.executor.submit(release.wait)
+        ran = []
+
+        with self.assertRaises(HashingBusy):
+            pool.run(ran.append, True)
+
+        release.set()
+        pool.executor.shutdown()
+        self.assertEqual(ran, [])
+
+    def test_full_pool_refuses_without_waiting(self):
+        """TEST A HASH PAST admitted IS REFUSED AT ONCE, NOT QUEUED"""
+        pool = HashingPool(workers=1, timeout=5, admitted=1)
+        release = threading.Event()
+        started = threading.Event()
+        first = threading.Thread(
+            target=pool.run, args=(lambda: started.set() or release.wait(),)
+        )
+        first.start()
+        started.wait(1)
+        ran = []
+
+        with self.assertRaises(HashingBusy):
+            pool.run(ran.append, True)
+
+        release.set()
+        first.join()
+        self.assertEqual(ran, [])
+        self.assertEqual(pool.run(len, "hash"), 4)
+
+    def test_timed_out_hash_holds_its_slot(self):
+        """TEST A HASH STILL RUNNING AFTER timeout KEEPS THE POOL FULL"""
+        pool = HashingPool(workers=1, timeout=0.05, admitted=1)
+        release = threading.Event()
+
+        with self.assertRaises(HashingBusy):
+            pool.run(release.wait)
+        with self.assertRaises(HashingBusy):
+            pool.run(len, "hash")
+
+        release.set()
+        # the one pool thread is free once it took the next task
+        pool.executor.submit(len, "").result()
+        self.assertEqual(pool.run(len, "hash"), 4)
+
+
+class HasherTests(TestCase):
+
+    def test_argon2_is_preferred(self):
+        encoded = make_password("recipe-password")
+
+        self.assertTrue(encoded.startswith('argon2$'))
+        self.assertIn('m=19456,t=2,p=1', encoded)
+        self.assertTrue(check_password("recipe-password", encoded))
+
+    def test_work_factor_change_rehashes(self):
+        """TEST A HASH WITH AN OLD COST IS REPLACED WHEN CHECKED"""
+        encoded = make_password("recipe-password")
+        updated = []
+
+        with override_settings(PASSWORD_HASHING=dict(
+            settings.PASSWORD_HASHING, ARGON2_TIME_COST=3
+        )):
+            self.assertTrue(check_password(
+                "recipe-password", encoded, setter=updated.append
+            ))
+
+        self.assertEqual(updated, ["recipe-password"])
+
+    def test_bcrypt_hashes_verify(self):
+        encoded = make_password("recipe-password", hasher='bcrypt_sha256')
+
+        self.assertTrue(check_password("recipe-password", encoded))
+        self.assertFalse(check_password("wrong-password", encoded))
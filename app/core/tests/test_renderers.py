@@ -0,0 +1,91 @@
+import datetime
+import io
+from collections import OrderedDict
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.renderers import ORJSONParser, ORJSONRenderer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class ORJSONRendererTests(TestCase):
+
+    def setUp(self) -> None:
+        self.data = OrderedDict([
+            ('id', 1),
+            ('title', "Pão de queijo \u2028\u2029 \"quoted\""),
+            ('price', Decimal('5.10')),
+            ('tags', [1, 2, 3]),
+            ('link', None),
+            ('ratio', 0.1),
+            ('ready', True),
+            ('created', datetime.datetime(2020, 1, 2, 3, 4, 5, 678901,
+                                          tzinfo=datetime.timezone.utc)),
+            ('day', datetime.date(2020, 1, 2)),
+            ('label', gettext_lazy("Ready")),
+            ('nested', {'variants': {}, 3: 'int key'}),
+        ])
+
+    def test_same_bytes_as_json_renderer(self):
+        self.assertEqual(ORJSONRenderer().render(self.data),
+                         JSONRenderer().render(self.data))
+
+    def test_indent_falls_back_to_json_renderer(self):
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(
+            ORJSONRenderer().render(self.data, media_type),
+            JSONRenderer().render(self.data, media_type)
+        )
+
+    def test_none_renders_empty(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+
+class ORJSONParserTests(TestCase):
+
+    def test_same_data_as_json_parser(self):
+        body = '{"title": "Pão", "tags": [1, 2], "price": "5.10"}'.encode()
+
+        self.assertEqual(ORJSONParser().parse(io.BytesIO(body)),
+                         JSONParser().parse(io.BytesIO(body)))
+
+    def test_invalid_json_is_parse_error(self):
+        for body in (b'{"title": ', b'{"price": NaN}', b'\xff'):
+            with self.assertRaises(ParseError):
+                ORJSONParser().parse(io.BytesIO(body))
+
+
+class JSONApiTests(TestCase):
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "json@recipe.com",
+            'recipetestpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_json_round_trip(self):
+        payload = {'title': "Pão", 'time_minutes': 5, 'price': "5.10",
+                   'tags': [], 'ingredients': []}
+
+        res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.get(id=res.data['id']).title, "Pão")
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertIn('"title":"Pão"'.encode(), res.content)
+        self.assertIn(b'"price":"5.10"', res.content)
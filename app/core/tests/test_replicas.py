@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import replicas
+from core.models import CollectionVersion, Recipe, Tag
+from core.replicas import ReplicaRouter, is_pinned
+from recipe.caching import TAGS, bump_versions, get_versions
+from recipe.images import set_status
+
+TAG_URL = reverse("recipe:tag-list")
+
+
+# the 'sqlite' alias stands in for a replica that has not caught up
+@override_settings(DATABASE_REPLICAS=['sqlite'])
+class ReplicaRoutingTests(TestCase):
+    multi_db = True
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            "replica@recipe.com",
+            'recipetestpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_safe_reads_use_replica(self):
+        """TEST A GET IS SERVED FROM THE REPLICA"""
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.get(TAG_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+    def test_reads_after_write_use_primary(self):
+        """TEST A USER READS THEIR OWN WRITE RIGHT AFTER MAKING IT"""
+        res = self.client.post(TAG_URL, {'name': "Vegan"})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(TAG_URL)
+
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']], ["Vegan"]
+        )
+
+    @override_settings(REPLICA_ROUTING={'STICKY_SECONDS': 0,
+                                        'CACHE_ALIAS': 'default'})
+    def test_stickiness_expires(self):
+        self.client.post(TAG_URL, {'name': "Vegan"})
+
+        res = self.client.get(TAG_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_other_users_not_pinned(self):
+        self.client.post(TAG_URL, {'name': "Vegan"})
+        other_user = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        Tag.objects.create(user=other_user, name="Dessert")
+        self.client.force_authenticate(other_user)
+
+        res = self.client.get(TAG_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_collection_versions_read_from_primary(self):
+        """TEST A LAGGING REPLICA'S VERSION IS NEVER CACHED"""
+        CollectionVersion.objects.using('sqlite').create(
+            user_id=self.user.pk, kind=TAGS, version=1
+        )
+        bump_versions(self.user.pk, TAGS)
+        current = CollectionVersion.objects.get(user=self.user, kind=TAGS)
+        replicas._state.replica = 'sqlite'
+        self.addCleanup(setattr, replicas._state, 'replica', None)
+
+        [(version, _)] = get_versions(self.user.pk, [TAGS])
+
+        self.assertEqual(version, current.version)
+
+    def test_image_status_pins_owner(self):
+        """TEST THE OWNER READS THE NEW IMAGE STATUS FROM THE PRIMARY"""
+        recipe = Recipe.objects.create(user=self.user, title="Toast",
+                                       time_minutes=1, price=1)
+
+        set_status(recipe, Recipe.IMG_READY)
+
+        self.assertTrue(is_pinned(self.user.pk))
+
+    def test_writes_and_migrations_stay_on_primary(self):
+        router = ReplicaRouter()
+        tag = Tag.objects.using('sqlite').create(user_id=1, name="Vegan")
+
+        self.assertEqual(router.db_for_write(Tag, instance=tag), 'default')
+        self.assertIsNone(router.db_for_read(Tag))
+        self.assertFalse(router.allow_migrate('sqlite', 'core'))
+        self.assertIsNone(router.allow_migrate('default', 'core'))
@@ -0,0 +1,85 @@
+import os
+
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from core.models import ImageBlob, Recipe
+from core.storage import image_storage
+from core.tests.test_models import sample_user
+
+
+def sample_recipe(user, **params):
+    defaults = {"title": "Sample recipe", "time_minutes": 10, "price": 5.0}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self) -> None:
+        self.names = []
+
+    def tearDown(self) -> None:
+        for name in self.names:
+            image_storage.delete(name)
+
+    def save(self, name, data):
+        name = image_storage.save(name, ContentFile(data))
+        self.names.append(name)
+        return name
+
+    def test_same_content_stored_once(self):
+        """TEST THAT IDENTICAL CONTENT MAPS TO ONE FILE"""
+        name1 = self.save('uploads/recipe/one.jpg', b'same bytes')
+        name2 = self.save('uploads/recipe/two.jpg', b'same bytes')
+        name3 = self.save('uploads/recipe/three.jpg', b'other bytes')
+
+        self.assertEqual(name1, name2)
+        self.assertNotEqual(name1, name3)
+        self.assertTrue(image_storage.is_content_name(name1))
+
+    def test_content_names_written_verbatim(self):
+        name = self.save('uploads/recipe/one.jpg', b'original')
+        derived = name.replace('.jpg', '_small.webp')
+
+        self.assertEqual(self.save(derived, b'variant'), derived)
+
+    def test_replace_never_leaves_name_missing(self):
+        """TEST A READER OF THE OLD FILE KEEPS IT, NEW READERS GET THE NEW"""
+        name = self.save('uploads/recipe/one.jpg', b'with exif')
+        directory = os.path.dirname(image_storage.path(name))
+
+        with image_storage.open(name) as old:
+            image_storage.replace(name, b'stripped')
+            self.assertEqual(old.read(), b'with exif')
+
+        with image_storage.open(name) as new:
+            self.assertEqual(new.read(), b'stripped')
+        self.assertEqual(os.listdir(directory), [os.path.basename(name)])
+        self.assertTrue(os.stat(image_storage.path(name)).st_mode & 0o044)
+
+
+class ImageRefcountTests(TestCase):
+    def setUp(self) -> None:
+        self.user = sample_user()
+
+    def test_refcount_follows_recipes(self):
+        """TEST THAT REFERENCES ARE COUNTED ACROSS RECIPE.IMG"""
+        recipe1 = sample_recipe(self.user, img='uploads/recipe/a.jpg')
+        recipe2 = sample_recipe(self.user, img='uploads/recipe/a.jpg')
+        self.assertEqual(
+            ImageBlob.objects.get(name='uploads/recipe/a.jpg').refcount, 2
+        )
+
+        recipe1.img = 'uploads/recipe/b.jpg'
+        recipe1.save()
+        self.assertEqual(
+            ImageBlob.objects.get(name='uploads/recipe/a.jpg').refcount, 1
+        )
+        self.assertEqual(
+            ImageBlob.objects.get(name='uploads/recipe/b.jpg').refcount, 1
+        )
+
+        recipe2.delete()
+        self.assertEqual(
+            ImageBlob.objects.get(name='uploads/recipe/a.jpg').refcount, 0
+        )
@@ -0,0 +1,129 @@
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import UserBucketThrottle
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TOKEN_URL = reverse('user:token')
+
+
+def rates(**scopes):
+    return override_settings(REST_FRAMEWORK=dict(
+        settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES=scopes
+    ))
+
+
+class TokenBucketThrottleTests(TestCase):
+
+    def setUp(self) -> None:
+        caches[settings.THROTTLE_CACHE_ALIAS].clear()
+        self.user = get_user_model().objects.create_user(
+            "throttle@recipe.com",
+            'recipetestpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.payload = {'title': "Pie", 'time_minutes': 5, 'price': "5.00"}
+
+    @rates(user='2/min')
+    def test_user_burst_then_throttled(self):
+        """TEST A USER GETS RATE N BURSTS, THEN 429 WITH RETRY-AFTER"""
+        for _ in range(2):
+            res = self.client.get(RECIPES_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', res)
+
+    @rates(user='1/s')
+    def test_bucket_refills(self):
+        with patch.object(UserBucketThrottle, 'timer',
+                          side_effect=[100.0, 100.5, 101.5]):
+            codes = [self.client.get(RECIPES_URL).status_code
+                     for _ in range(3)]
+
+        self.assertEqual(codes, [200, 429, 200])
+
+    @rates(recipe_write='1/min')
+    def test_endpoint_scope_spares_other_endpoints(self):
+        """TEST A THROTTLED WRITE ENDPOINT LEAVES READS AVAILABLE"""
+        res = self.client.post(RECIPES_URL, self.payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.post(RECIPES_URL, self.payload)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @rates(recipe_write='1/min')
+    def test_buckets_are_per_user(self):
+        self.client.post(RECIPES_URL, self.payload)
+        other = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        self.client.force_authenticate(other)
+
+        res = self.client.post(RECIPES_URL, self.payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    @rates(login='1/min')
+    def test_login_throttled_per_address(self):
+        self.client.force_authenticate(None)
+        payload = {'email': "throttle@recipe.com", 'password': "wrong"}
+        self.client.post(TOKEN_URL, payload)
+
+        res = self.client.post(TOKEN_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    @rates(login='1/min')
+    def test_forged_forwarded_for_still_throttled(self):
+        """TEST A CLIENT CAN'T GET A NEW BUCKET BY FORGING X-FORWARDED-FOR"""
+        self.client.force_authenticate(None)
+        payload = {'email': "throttle@recipe.com", 'password': "wrong"}
+        codes = [
+            self.client.post(TOKEN_URL, payload,
+                             HTTP_X_FORWARDED_FOR=f"1.2.3.{i}").status_code
+            for i in range(3)
+        ]
+
+        self.assertEqual(codes, [400, 429, 429])
+
+    @override_settings(REST_FRAMEWORK=dict(
+        settings.REST_FRAMEWORK, NUM_PROXIES=1,
+        DEFAULT_THROTTLE_RATES={'login': '1/min'}
+    ))
+    def test_behind_proxy_keys_on_appended_address(self):
+        """TEST THE ADDRESS THE PROXY APPENDS IS THE BUCKET, NOT THE REST"""
+        self.client.force_authenticate(None)
+        payload = {'email': "throttle@recipe.com", 'password': "wrong"}
+        codes = [
+            self.client.post(
+                TOKEN_URL, payload,
+                HTTP_X_FORWARDED_FOR=f"1.2.3.{i}, {client}"
+            ).status_code
+            for i, client in enumerate(["5.6.7.8", "5.6.7.8", "5.6.7.9"])
+        ]
+
+        self.assertEqual(codes, [400, 429, 400])
+
+    @rates(user='1/min')
+    def test_decision_needs_no_query(self):
+        self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
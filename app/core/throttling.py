@@ -0,0 +1,101 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'N/period' -> (N, SECONDS), period being s, m, h or d"""
+    num, period = rate.split('/')
+    return int(num), DURATIONS[period[0]]
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """TOKEN BUCKET THROTTLE KEPT IN THE THROTTLE_CACHE_ALIAS CACHE
+
+    The 'N/period' rate of the scope, from DEFAULT_THROTTLE_RATES,
+    allows bursts of N requests and refills N tokens per period. A
+    decision is one get and one set of a (tokens, timestamp) pair
+    whatever the rate, and never touches the database. Workers racing
+    on a bucket may let a request or two through above the rate.
+    """
+    scope = None
+    timer = time.time
+
+    def get_scope(self, view):
+        return self.scope
+
+    def get_bucket_id(self, request, view):
+        """WHAT THE BUCKET IS FOR, NONE NOT TO THROTTLE THE REQUEST"""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        bucket_id = self.get_bucket_id(request, view)
+        if rate is None or bucket_id is None:
+            return True
+        capacity, duration = parse_rate(rate)
+        refill = capacity / duration
+
+        cache = caches[settings.THROTTLE_CACHE_ALIAS]
+        key = f"throttle:{scope}:{bucket_id}"
+        now = self.timer()
+        tokens, stamp = cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - stamp) * refill)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+            self.wait_seconds = None
+        else:
+            self.wait_seconds = (1 - tokens) / refill
+        # a bucket untouched for a duration is full again
+        cache.set(key, (tokens, now), duration)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    """OVERALL REQUEST RATE OF EACH AUTHENTICATED USER"""
+    scope = 'user'
+
+    def get_bucket_id(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class AnonBucketThrottle(TokenBucketThrottle):
+    """OVERALL REQUEST RATE OF EACH ANONYMOUS CLIENT ADDRESS"""
+    scope = 'anon'
+
+    def get_bucket_id(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class ScopedBucketThrottle(TokenBucketThrottle):
+    """PER ENDPOINT RATE OF EACH USER, OR ANONYMOUS CLIENT ADDRESS
+
+    The scope is the view's throttle_scope, or for viewsets the entry
+    of throttle_scopes for the action; unscoped endpoints pass.
+    """
+
+    def get_scope(self, view):
+        scopes = getattr(view, 'throttle_scopes', None)
+        if scopes is not None:
+            return scopes.get(getattr(view, 'action', None))
+        return getattr(view, 'throttle_scope', None)
+
+    def get_bucket_id(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
@@ -0,0 +1,40 @@
+"""
+Gunicorn configuration of the production profile.
+
+Used by docker-compose-deploy.yaml. Every value can be overridden
+from the environment.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# processes for the CPU bound work, threads to overlap database and
+# storage waits; with DB_POOL_SIZE set, make it at least the threads
+workers = int(
+    os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1)
+)
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# import Django once in the master, workers fork with it loaded
+preload_app = True
+
+# recycle workers to bound memory growth, jittered so they don't all
+# restart at the same time
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(
+    os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100)
+)
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# connections from the proxy are reused, see proxy/default.conf
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 75))
+
+accesslog = '-'
+errorlog = '-'
+# X-Forwarded-* headers are trusted from the proxy container only, its
+# fixed address in docker-compose-deploy.yaml
+forwarded_allow_ips = os.environ['FORWARDED_ALLOW_IPS']
@@ -1,5 +1,34 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.core import checks
+from django.db.models.signals import m2m_changed, post_delete, \
+    post_save, pre_delete
 
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        from core.models import Recipe, Tag, Ingredient
+        from recipe import caching, signals
+
+        checks.register(caching.check_shared_cache, checks.Tags.caches,
+                        deploy=True)
+
+        post_save.connect(signals.recipe_changed, sender=Recipe)
+        pre_delete.connect(signals.remember_recipe_links, sender=Recipe)
+        post_delete.connect(signals.recipe_deleted, sender=Recipe)
+        for model, receiver in ((Tag, signals.tag_changed),
+                                (Ingredient, signals.ingredient_changed)):
+            post_save.connect(receiver, sender=model)
+            post_delete.connect(receiver, sender=model)
+            pre_delete.connect(signals.remember_linked_recipes, sender=model)
+            post_save.connect(signals.index_linked_recipes, sender=model)
+            post_delete.connect(signals.index_linked_recipes, sender=model)
+            post_save.connect(signals.recount_saved, sender=model)
+        m2m_changed.connect(signals.recipe_tags_changed,
+                            sender=Recipe.tags.through)
+        m2m_changed.connect(signals.recipe_ingredients_changed,
+                            sender=Recipe.ingredients.through)
+        post_save.connect(signals.user_created,
+                          sender=settings.AUTH_USER_MODEL)
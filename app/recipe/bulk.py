@@ -0,0 +1,272 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from core import search
+from core.models import ImageBlob, Recipe
+from recipe.caching import KINDS, bump_versions
+from recipe.filters import through_columns
+
+NOT_FOUND = 'Invalid pk "{}" - object does not exist.'
+
+
+def is_id(value):
+    """AN INTEGER PRIMARY KEY, NOT A BOOLEAN (bool SUBCLASSES int)"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def release_images(names):
+    """DROP ONE IMAGE REFERENCE PER OCCURRENCE IN names, IN ONE UPDATE"""
+    counts = Counter(name for name in names if name)
+    if not counts:
+        return
+    ImageBlob.objects.filter(name__in=counts).update(refcount=Greatest(
+        F('refcount') - Case(*(
+            When(name=name, then=Value(count))
+            for name, count in counts.items()
+        ), output_field=IntegerField()), 0
+    ))
+
+
+def insert_rows(model, objs):
+    """INSERT objs IN BULK, RETURNING THEM WITH THEIR PRIMARY KEYS SET"""
+    if connection.features.can_return_ids_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    # backends that can't return ids (sqlite) insert row by row instead
+    for obj in objs:
+        obj.save()
+    return objs
+
+
+class BulkMixin:
+    """POST/PATCH/DELETE <list>/bulk/ TO WRITE MANY OBJECTS AT ONCE
+
+    Items are validated first, with every related id of a relation
+    resolved in a single query, and nothing is written unless all of
+    them are valid; errors are reported per item, aligned with the
+    input list. Rows and M2M links are then written in bulk inside one
+    transaction.
+    """
+    bulk_relations = ()
+
+    def owned(self):
+        return self.queryset.model.objects.filter(user=self.request.user)
+
+    @action(methods=['post', 'patch', 'delete'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        if request.method == 'DELETE':
+            return self.bulk_destroy(request)
+
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError(
+                {'non_field_errors': ["Expected a list of items."]}
+            )
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [
+                f"At most {settings.BULK_MAX_ITEMS} items per request."
+            ]})
+
+        partial = request.method == 'PATCH'
+        validated, errors = self.bulk_validate(items, partial)
+        if any(errors):
+            return Response({'errors': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            with transaction.atomic():
+                if partial:
+                    ids = self.perform_bulk_update(validated)
+                else:
+                    ids = self.perform_bulk_create(validated)
+                # bulk writes skip the signals that keep the search index
+                search.index_recipes(
+                    search.linked_recipe_ids(self.queryset.model, ids)
+                )
+        except IntegrityError:
+            # e.g. renaming a tag to the name of another one
+            raise ValidationError({'non_field_errors': [
+                "The items conflict with existing objects."
+            ]})
+        bump_versions(request.user.pk, *self.cache_kinds)
+
+        return Response(
+            {'ids': ids},
+            status=status.HTTP_200_OK if partial else status.HTTP_201_CREATED
+        )
+
+    def bulk_validate(self, items, partial):
+        """RETURN (validated data, errors), BOTH ALIGNED WITH items"""
+        serializer_class = self.get_serializer_class()
+        validated, errors = [], []
+        for item in items:
+            serializer = serializer_class(data=item, partial=partial)
+            serializer.is_valid()
+            item_errors = dict(serializer.errors)
+            data = dict(serializer.validated_data) if not item_errors \
+                else {}
+            if partial:
+                pk = item.get('id') if isinstance(item, dict) else None
+                if not is_id(pk):
+                    item_errors['id'] = ["This field is required."]
+                data['id'] = pk
+            validated.append(data)
+            errors.append(item_errors)
+
+        if partial:
+            self.check_ids(
+                self.owned(), [data['id'] for data in validated],
+                errors, 'id'
+            )
+        for name in self.bulk_relations:
+            related = self.queryset.model._meta.get_field(name) \
+                .related_model.objects.filter(user=self.request.user)
+            self.check_ids(
+                related, [data.get(name, ()) for data in validated],
+                errors, name
+            )
+        return validated, errors
+
+    @staticmethod
+    def check_ids(queryset, ids_per_item, errors, field_name):
+        """FLAG IDS MISSING FROM queryset, LOOKING THEM ALL UP AT ONCE"""
+        flat = [
+            [pk] if not isinstance(pk, (list, tuple)) else pk
+            for pk in ids_per_item
+        ]
+        wanted = {pk for pks in flat for pk in pks if is_id(pk)}
+        found = set(
+            queryset.filter(pk__in=wanted).values_list('pk', flat=True)
+        ) if wanted else set()
+        for pks, item_errors in zip(flat, errors):
+            missing = [pk for pk in pks if is_id(pk) and pk not in found]
+            if missing:
+                item_errors[field_name] = [
+                    NOT_FOUND.format(pk) for pk in missing
+                ]
+
+    def split_relations(self, validated):
+        return [
+            {name: data.pop(name) for name in self.bulk_relations
+             if name in data}
+            for data in validated
+        ]
+
+    def perform_bulk_create(self, validated):
+        model = self.queryset.model
+        relations = self.split_relations(validated)
+        objs = insert_rows(model, [
+            model(user=self.request.user, **data) for data in validated
+        ])
+        ids = [obj.pk for obj in objs]
+        self.link_relations(ids, relations, replace=False)
+        return ids
+
+    def perform_bulk_update(self, validated):
+        model = self.queryset.model
+        relations = self.split_relations(validated)
+        ids = [data.pop('id') for data in validated]
+
+        whens = {}
+        for pk, data in zip(ids, validated):
+            for name, value in data.items():
+                whens.setdefault(name, []).append(
+                    When(pk=pk, then=Value(value))
+                )
+        updates = {
+            name: Case(*conditions, default=F(name),
+                       output_field=model._meta.get_field(name))
+            for name, conditions in whens.items()
+        }
+        updates['updated_at'] = timezone.now()
+        self.owned().filter(pk__in=ids).update(**updates)
+
+        self.link_relations(ids, relations, replace=True)
+        return ids
+
+    def link_relations(self, ids, relations, replace):
+        """WRITE THE M2M LINKS OF EVERY ITEM WITH ONE INSERT PER RELATION"""
+        for name in self.bulk_relations:
+            through, source, target = through_columns(
+                self.queryset.model, name
+            )
+            linked = [(pk, rel[name]) for pk, rel in zip(ids, relations)
+                      if name in rel]
+            recount = {related_id for _, related_ids in linked
+                       for related_id in related_ids}
+            if replace and linked:
+                old_links = through.objects.filter(**{
+                    f"{source}__in": [pk for pk, _ in linked]
+                })
+                recount.update(old_links.values_list(target, flat=True))
+                old_links.delete()
+            through.objects.bulk_create(
+                through(**{source: pk, target: related_id})
+                for pk, related_ids in linked
+                for related_id in set(related_ids)
+            )
+            self.queryset.model._meta.get_field(name).related_model \
+                .objects.filter(pk__in=recount).refresh_recipe_counts()
+
+    def bulk_destroy(self, request):
+        ids = request.data.get('ids') if isinstance(request.data, dict) \
+            else None
+        if not isinstance(ids, list) or \
+                not all(is_id(pk) for pk in ids):
+            raise ValidationError({'ids': ["Expected a list of ids."]})
+        if len(ids) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({'ids': [
+                f"At most {settings.BULK_MAX_ITEMS} ids per request."
+            ]})
+
+        errors = [{} for _ in ids]
+        self.check_ids(self.owned(), ids, errors, 'id')
+        if any(errors):
+            return Response({'errors': errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            recipe_ids = search.linked_recipe_ids(self.queryset.model, ids)
+            self.perform_bulk_destroy(ids)
+            search.index_recipes(recipe_ids)
+        # removed links change the recipes and the assigned tags too
+        bump_versions(request.user.pk, *KINDS)
+        return Response({'deleted': len(set(ids))})
+
+    def perform_bulk_destroy(self, ids):
+        """DELETE THE ROWS AND THEIR M2M LINKS, A FEW QUERIES IN ALL
+
+        Model.delete() would load every row and send its delete signals
+        one by one; what those receivers keep up to date (recipe_count,
+        image reference counts) is adjusted here in bulk instead.
+        """
+        model = self.queryset.model
+        rows = self.owned().filter(pk__in=ids)
+        recounts = []
+        for field in Recipe._meta.many_to_many:
+            through, source, target = through_columns(Recipe, field.name)
+            if model is Recipe:
+                links = through.objects.filter(**{f"{source}__in": ids})
+                recounts.append(field.related_model.objects.filter(
+                    pk__in=list(links.values_list(target, flat=True))
+                ))
+            elif model is field.related_model:
+                links = through.objects.filter(**{f"{target}__in": ids})
+            else:
+                continue
+            links._raw_delete(links.db)
+        if model is Recipe:
+            release_images(rows.values_list('img', flat=True))
+
+        rows._raw_delete(rows.db)
+        for related in recounts:
+            related.refresh_recipe_counts()
@@ -0,0 +1,169 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.models import CollectionVersion
+
+RECIPES = 'recipe'
+TAGS = 'tag'
+INGREDIENTS = 'ingredient'
+KINDS = (RECIPES, TAGS, INGREDIENTS)
+PER_PROCESS_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+
+
+def response_cache():
+    return caches[settings.RESPONSE_CACHE['CACHE_ALIAS']]
+
+
+def check_shared_cache(app_configs, **kwargs):
+    """DEPLOY CHECK: EVERY WORKER MUST SEE THE SAME COLLECTION VERSIONS
+
+    A bump only evicts the versions of the cache it runs against; with a
+    per-process cache the other workers keep serving the old ones until
+    VERSION_TIMEOUT.
+    """
+    alias = settings.RESPONSE_CACHE['CACHE_ALIAS']
+    if settings.CACHES[alias]['BACKEND'] not in PER_PROCESS_BACKENDS:
+        return []
+    return [checks.Error(
+        f"RESPONSE_CACHE['CACHE_ALIAS'] {alias!r} is a per-process cache.",
+        hint="Point it at a cache shared by every worker, e.g. memcached.",
+        id='recipe.E001',
+    )]
+
+
+def version_key(user_id, kind):
+    return f"collection-version:{user_id}:{kind}"
+
+
+def new_version():
+    # time based so a user id reused after a restore never repeats a value
+    return int(time.time() * 1000000)
+
+
+def versions():
+    # always the primary: a lagging replica would cache a version older
+    # than the last bump, and serve stale responses under it
+    return CollectionVersion.objects.using(DEFAULT_DB_ALIAS)
+
+
+def get_versions(user_id, kinds):
+    """RETURN [(version, modified_at)] FOR EACH KIND OF THE USER'S DATA
+
+    Served from the cache when warm, otherwise from one lookup on the
+    (user, kind) unique index. Cached versions expire after
+    RESPONSE_CACHE['VERSION_TIMEOUT'] seconds: a reader racing a bump
+    may write the old version back, and it must not stick.
+    """
+    cache = response_cache()
+    keys = {kind: version_key(user_id, kind) for kind in kinds}
+    found = cache.get_many(keys.values())
+    missing = [kind for kind in kinds if keys[kind] not in found]
+
+    if missing:
+        rows = {
+            row.kind: (row.version, row.modified_at)
+            for row in versions().filter(user_id=user_id, kind__in=missing)
+        }
+        for kind in missing:
+            if kind not in rows:
+                row, _ = versions().get_or_create(
+                    user_id=user_id, kind=kind,
+                    defaults={'version': new_version()}
+                )
+                rows[kind] = (row.version, row.modified_at)
+        cache.set_many({keys[kind]: rows[kind] for kind in missing},
+                       settings.RESPONSE_CACHE['VERSION_TIMEOUT'])
+        found.update({keys[kind]: rows[kind] for kind in missing})
+
+    return [found[keys[kind]] for kind in kinds]
+
+
+def bump_versions(user_id, *kinds):
+    """INVALIDATE EVERY CACHED RESPONSE BUILT FROM THE GIVEN KINDS"""
+    now = timezone.now()
+    updated = versions() \
+        .filter(user_id=user_id, kind__in=kinds) \
+        .update(version=F('version') + 1, modified_at=now)
+    if updated < len(kinds):
+        for kind in kinds:
+            versions().get_or_create(
+                user_id=user_id, kind=kind,
+                defaults={'version': new_version(), 'modified_at': now}
+            )
+
+    keys = [version_key(user_id, kind) for kind in kinds]
+    cache = response_cache()
+    cache.delete_many(keys)
+    # readers may have cached the old version before this write commits
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class CachedResponseMixin:
+    """CACHE READ RESPONSE DATA PER USER, WITH CONDITIONAL GET
+
+    Entries are keyed on the user, the request URL and the version of
+    every kind of data the view reads (cache_kinds); writes bump those
+    versions (see recipe.signals). The ETag comes from the same key and
+    Last-Modified from the versions, so If-None-Match/If-Modified-Since
+    are answered without the serializer. list is cached automatically,
+    other read actions go through cached_response.
+    """
+    cache_kinds = KINDS
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        versions = get_versions(request.user.pk, self.cache_kinds)
+        digest = hashlib.md5(":".join([
+            str(request.user.pk), self.action,
+            request.build_absolute_uri(),
+            request.accepted_renderer.format,
+            *(str(version) for version, _ in versions),
+        ]).encode()).hexdigest()
+        key, etag = f"response:{digest}", f'"{digest}"'
+        modified = [modified_at for _, modified_at in versions
+                    if modified_at is not None]
+        last_modified = int(max(modified).timestamp()) if modified else None
+
+        if self.not_modified(request, etag, last_modified):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            cache = response_cache()
+            data = cache.get(key)
+            if data is not None:
+                response = Response(data)
+            else:
+                response = handler(request, *args, **kwargs)
+                if response.status_code != status.HTTP_200_OK:
+                    return response
+                cache.set(key, response.data,
+                          settings.RESPONSE_CACHE['TIMEOUT'])
+
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    @staticmethod
+    def not_modified(request, etag, last_modified):
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            return etag in if_none_match
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return None not in (if_modified_since, last_modified) \
+            and last_modified <= if_modified_since
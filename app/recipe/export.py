@@ -0,0 +1,74 @@
+import csv
+import io
+
+from rest_framework import renderers
+
+from core.renderers import ORJSONRenderer
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """ONE JSON DOCUMENT PER LINE, FOR EACH ITEM OF A LIST"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        items = data if isinstance(data, list) else [data]
+        render = super().render
+        return b''.join(render(item) + b'\n' for item in items)
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """A CSV ROW FOR EACH DICT OF A LIST
+
+    The columns are renderer_context['columns'], or the keys of the
+    first row; the header row is left out when renderer_context has
+    header=False. Related objects are listed by name, ';' separated.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        renderer_context = renderer_context or {}
+        rows = data if isinstance(data, list) else [data]
+        columns = renderer_context.get('columns')
+        if not columns:
+            columns = list(rows[0]) if rows else []
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        if renderer_context.get('header', True):
+            writer.writerow(columns)
+        for row in rows:
+            writer.writerow([cell(row.get(column)) for column in columns])
+        return out.getvalue().encode(self.charset)
+
+
+def cell(value):
+    """ONE VALUE AS A CSV CELL"""
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ';'.join(
+            str(item['name']) if isinstance(item, dict) else str(item)
+            for item in value
+        )
+    return value
+
+
+def stream(queryset, represent, renderer, renderer_context, chunk_size):
+    """YIELD THE RENDERED RECIPES OF queryset, A CHUNK AT A TIME"""
+    first = True
+    for chunk in queryset.chunks(chunk_size):
+        yield renderer.render(
+            [represent(recipe) for recipe in chunk], renderer.media_type,
+            dict(renderer_context, header=first)
+        )
+        first = False
+    if first:
+        # nothing to export, still a CSV header
+        yield renderer.render([], renderer.media_type, renderer_context)
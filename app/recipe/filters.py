@@ -0,0 +1,87 @@
+from django.db.models import Count, Exists, OuterRef
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from core.search import search_recipes
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+
+
+def params_to_ints(value, param):
+    """CONVERT A COMMA SEPARATED STRING OF IDS TO A SORTED LIST OF INT"""
+    try:
+        return sorted({int(str_id) for str_id in value.split(',')})
+    except ValueError:
+        raise ValidationError(
+            {param: "Must be a comma separated list of ids."}
+        )
+
+
+def through_columns(model, field_name):
+    """RETURN (through model, source column, target column) OF AN M2M"""
+    field = model._meta.get_field(field_name)
+    through = field.remote_field.through
+    source = through._meta.get_field(field.m2m_field_name()).attname
+    target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+    return through, source, target
+
+
+def filter_related(queryset, field_name, ids, mode=MATCH_ANY):
+    """FILTER RECIPES LINKED TO ANY/ALL OF THE GIVEN RELATED IDS
+
+    Both modes run as a subquery on the M2M through table instead of
+    joining it, so each recipe is returned once and the cost does not
+    multiply with the number of filtered relations.
+    """
+    through, source, target = through_columns(queryset.model, field_name)
+    links = through.objects.filter(**{f"{target}__in": ids})
+
+    if mode == MATCH_ALL:
+        matching = links.values(source) \
+            .annotate(matched=Count(target)) \
+            .filter(matched=len(ids)) \
+            .values(source)
+        return queryset.filter(pk__in=matching)
+
+    annotation = f"has_{field_name}"
+    return queryset.annotate(**{
+        annotation: Exists(links.filter(**{source: OuterRef('pk')}))
+    }).filter(**{annotation: True})
+
+
+class RecipeRelatedFilter(BaseFilterBackend):
+    """FILTER RECIPES BY ?tags=1,2&tags_mode=all AND ?ingredients=..."""
+    fields = ('tags', 'ingredients')
+
+    def filter_queryset(self, request, queryset, view):
+        for field_name in self.fields:
+            value = request.query_params.get(field_name)
+            if not value:
+                continue
+
+            mode_param = f"{field_name}_mode"
+            mode = request.query_params.get(mode_param, MATCH_ANY)
+            if mode not in (MATCH_ANY, MATCH_ALL):
+                raise ValidationError(
+                    {mode_param: f"Must be '{MATCH_ANY}' or '{MATCH_ALL}'."}
+                )
+
+            ids = params_to_ints(value, field_name)
+            queryset = filter_related(queryset, field_name, ids, mode)
+
+        return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """FULL-TEXT SEARCH ?q= OVER TITLES, TAG AND INGREDIENT NAMES
+
+    Matches are annotated with a rank, which the pagination orders by.
+    """
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        q = request.query_params.get(self.search_param, '').strip()
+        if not q:
+            return queryset
+        return search_recipes(queryset, q)
@@ -0,0 +1,135 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from django.conf import settings
+from django.db import connection, transaction
+
+from core.models import Recipe
+from core.replicas import pin_to_primary
+from recipe.caching import RECIPES, bump_versions
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_PROCESSING['WORKERS'],
+    thread_name_prefix='recipe-image',
+)
+
+# EXIF orientation tag value -> transposes that put the image upright
+ORIENTATION_TRANSPOSES = {
+    2: (Image.FLIP_LEFT_RIGHT,),
+    3: (Image.ROTATE_180,),
+    4: (Image.FLIP_TOP_BOTTOM,),
+    5: (Image.ROTATE_90, Image.FLIP_TOP_BOTTOM),
+    6: (Image.ROTATE_270,),
+    7: (Image.ROTATE_270, Image.FLIP_TOP_BOTTOM),
+    8: (Image.ROTATE_90,),
+}
+EXIF_ORIENTATION = 0x0112
+
+
+def variant_path(name, variant):
+    """RETURN THE STORAGE PATH OF A WEBP VARIANT OF AN IMAGE"""
+    return f"{os.path.splitext(name)[0]}_{variant}.webp"
+
+
+def variant_urls(recipe):
+    """RETURN {variant: url} FOR A RECIPE WHOSE VARIANTS ARE READY"""
+    if recipe.img_status != Recipe.IMG_READY:
+        return {}
+    storage = recipe.img.storage
+    return {
+        variant: storage.url(variant_path(recipe.img.name, variant))
+        for variant in settings.IMAGE_PROCESSING['VARIANTS']
+    }
+
+
+def upright(img):
+    """APPLY THE EXIF ORIENTATION SO STRIPPING EXIF KEEPS THE IMAGE UPRIGHT"""
+    if hasattr(img, 'getexif'):
+        exif = img.getexif()
+    else:
+        exif = img._getexif() if hasattr(img, '_getexif') else None
+    orientation = exif.get(EXIF_ORIENTATION) if exif else None
+    for method in ORIENTATION_TRANSPOSES.get(orientation, ()):
+        img = img.transpose(method)
+    return img
+
+
+def save_image(storage, name, img, format, **params):
+    """ENCODE img AND WRITE IT TO storage AT name, REPLACING ANY FILE
+
+    Other recipes may be serving the file, it is never missing.
+    """
+    buffer = io.BytesIO()
+    img.save(buffer, format=format, **params)
+    storage.replace(name, buffer.getvalue())
+
+
+def process_recipe_image(recipe_id):
+    """STRIP EXIF FROM A RECIPE IMAGE AND RENDER ITS WEBP VARIANTS"""
+    options = settings.IMAGE_PROCESSING
+    recipe = Recipe.objects.only('img', 'user').get(pk=recipe_id)
+    storage, name = recipe.img.storage, recipe.img.name
+    status = Recipe.IMG_READY
+    variant_names = [
+        variant_path(name, variant) for variant in options['VARIANTS']
+    ]
+
+    # content shared with another recipe has been processed already
+    if all(storage.exists(variant) for variant in variant_names):
+        return set_status(recipe, status)
+
+    try:
+        with storage.open(name) as fp:
+            Image.open(fp).verify()
+        with storage.open(name) as fp:
+            img = Image.open(fp)
+            img.load()
+        # multi-picture phone photos are re-encoded as their JPEG frame
+        image_format = 'JPEG' if img.format == 'MPO' else img.format
+        params = {'quality': 90} if image_format == 'JPEG' else {}
+        img = upright(img)
+
+        # re-encoding without passing exif= drops all metadata
+        save_image(storage, name, img, image_format, **params)
+
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+        for variant, size in options['VARIANTS'].items():
+            resized = img.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            save_image(storage, variant_path(name, variant), resized,
+                       'WEBP', quality=options['WEBP_QUALITY'])
+    except Exception:
+        logger.exception("Processing the image of recipe %s failed",
+                         recipe_id)
+        status = Recipe.IMG_FAILED
+
+    return set_status(recipe, status)
+
+
+def set_status(recipe, status):
+    """RECORD THE OUTCOME UNLESS THE IMAGE WAS REPLACED MEANWHILE"""
+    Recipe.objects.filter(pk=recipe.pk, img=recipe.img.name) \
+        .update(img_status=status)
+    bump_versions(recipe.user_id, RECIPES)
+    if settings.DATABASE_REPLICAS:
+        # the owner polls for the status, which replicas may not have yet
+        pin_to_primary(recipe.user_id)
+    return status
+
+
+def _run(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_image_processing(recipe):
+    """PROCESS THE RECIPE IMAGE ON THE WORKER POOL ONCE THE ROW COMMITS"""
+    transaction.on_commit(lambda: executor.submit(_run, recipe.pk))
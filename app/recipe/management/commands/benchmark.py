@@ -0,0 +1,255 @@
+import io
+import random
+import time
+from statistics import median
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.models import Tag, Ingredient, Recipe
+from core.renderers import ORJSONParser, ORJSONRenderer
+from core.search import index_recipes, search_recipes, suggest_names
+from recipe.compiled import compile_serializer
+from recipe.filters import MATCH_ANY, MATCH_ALL, filter_related
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+
+SCENARIOS = {}
+# Words the seeded titles and names are drawn from, for search
+WORDS = (
+    "chicken", "coconut", "lime", "garlic", "ginger", "rice", "beans",
+    "pepper", "mango", "cheese", "tomato", "basil", "lemon", "pork",
+    "shrimp", "corn", "cassava", "chocolate", "banana", "onion",
+)
+
+
+def scenario(func):
+    """REGISTER A BENCHMARK SCENARIO UNDER ITS FUNCTION NAME"""
+    SCENARIOS[func.__name__] = func
+    return func
+
+
+def seed(recipes, tags=100, ingredients=100, links=5):
+    """CREATE A USER WITH A SEEDED RECIPE BOOK, RETURN THE USER"""
+    rnd = random.Random(0)
+    user = get_user_model().objects.create_user(
+        f"benchmark-{time.time()}@recipe.com", 'benchmark'
+    )
+    Tag.objects.bulk_create(
+        Tag(user=user, name=f"{rnd.choice(WORDS)} {i}") for i in range(tags)
+    )
+    Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f"{rnd.choice(WORDS)} {i}")
+        for i in range(ingredients)
+    )
+    Recipe.objects.bulk_create(
+        Recipe(user=user, title=" ".join(rnd.sample(WORDS, 3)),
+               time_minutes=i % 120, price=i % 100)
+        for i in range(recipes)
+    )
+    # bulk_create only sets primary keys on PostgreSQL, so read them back
+    tag_ids = list(
+        Tag.objects.filter(user=user).values_list('id', flat=True)
+    )
+    ingredient_ids = list(
+        Ingredient.objects.filter(user=user).values_list('id', flat=True)
+    )
+    recipe_ids = Recipe.objects.filter(user=user) \
+        .values_list('id', flat=True)
+
+    tag_links, ingredient_links = [], []
+    for recipe_id in recipe_ids:
+        for tag_id in rnd.sample(tag_ids, links):
+            tag_links.append(Recipe.tags.through(
+                recipe_id=recipe_id, tag_id=tag_id
+            ))
+        for ingredient_id in rnd.sample(ingredient_ids, links):
+            ingredient_links.append(Recipe.ingredients.through(
+                recipe_id=recipe_id, ingredient_id=ingredient_id
+            ))
+    Recipe.tags.through.objects.bulk_create(tag_links)
+    Recipe.ingredients.through.objects.bulk_create(ingredient_links)
+    # bulk_create skips the signals that keep the search index
+    index_recipes(recipe_ids)
+    return user
+
+
+def check_budget(label, ms, options):
+    """FAIL THE RUN WHEN A MEDIAN IS OVER THE --budget-ms LATENCY"""
+    budget = options['budget_ms']
+    if budget is not None and ms > budget:
+        raise CommandError(
+            f"{label}: median {ms:.2f} ms is over the {budget} ms budget"
+        )
+
+
+def timeit(func, repeat):
+    """RETURN THE MEDIAN WALL TIME OF func IN MILLISECONDS"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return median(samples)
+
+
+@scenario
+def filters(command, options):
+    """TAG FILTER LATENCY AS THE NUMBER OF REQUESTED IDS GROWS"""
+    user = seed(options['recipes'])
+    tag_ids = list(
+        Tag.objects.filter(user=user).values_list('id', flat=True)
+    )
+    recipes = Recipe.objects.filter(user=user)
+
+    command.stdout.write(f"{'ids':>5} {'any (ms)':>10} {'all (ms)':>10}")
+    for count in (1, 2, 4, 8, 16, 32):
+        ids = tag_ids[:count]
+        results = [
+            timeit(
+                lambda: list(
+                    filter_related(recipes, 'tags', ids, mode)
+                    .values_list('id', flat=True)[:50]
+                ),
+                options['repeat']
+            )
+            for mode in (MATCH_ANY, MATCH_ALL)
+        ]
+        command.stdout.write(
+            f"{count:>5} {results[0]:>10.2f} {results[1]:>10.2f}"
+        )
+        for mode, ms in zip((MATCH_ANY, MATCH_ALL), results):
+            check_budget(f"{count} ids, {mode}", ms, options)
+
+
+@scenario
+def search(command, options):
+    """RANKED FIRST PAGE OF ?q= SEARCH RESULTS BY NUMBER OF TERMS"""
+    user = seed(options['recipes'])
+    recipes = Recipe.objects.filter(user=user).for_list()
+
+    command.stdout.write(f"{'terms':>5} {'first page (ms)':>16}")
+    for count in (1, 2, 3):
+        q = " ".join(WORDS[:count])
+        hits = search_recipes(recipes, q)
+        ms = timeit(
+            lambda: list(hits.order_by('-rank', '-id')[:50]),
+            options['repeat']
+        )
+        command.stdout.write(f"{count:>5} {ms:>16.2f}")
+        check_budget(f"q={q!r}", ms, options)
+
+
+@scenario
+def suggest(command, options):
+    """TOP-10 TAG AUTOCOMPLETE OVER --recipes TAGS, BY TYPED PREFIX"""
+    user = seed(0, tags=options['recipes'], ingredients=0)
+    tags = Tag.objects.filter(user=user).only('id', 'name')
+
+    command.stdout.write(f"{'q':>8} {'ms':>8}")
+    # a long prefix, a short one, and one left to the fuzzy fallback
+    for q in ("chicken 1", "c", "hicken 12"):
+        ms = timeit(lambda: suggest_names(tags, q, 10), options['repeat'])
+        command.stdout.write(f"{q:>8} {ms:>8.2f}")
+        check_budget(f"q={q!r}", ms, options)
+
+
+@scenario
+def serializers(command, options):
+    """DRF VS COMPILED SERIALIZATION OF 1K AND 10K FETCHED RECIPES"""
+    user = seed(options['recipes'])
+    context = {'request': RequestFactory().get('/api/recipe/recipes/')}
+    render = JSONRenderer().render
+
+    command.stdout.write(
+        f"{'serializer':>10} {'recipes':>8} {'drf (ms)':>10} "
+        f"{'compiled (ms)':>14} {'speedup':>8}"
+    )
+    for serializer_class, queryset in (
+            (RecipeSerializer, Recipe.objects.for_list()),
+            (RecipeDetailSerializer, Recipe.objects.for_detail())):
+        for count in (1000, 10000):
+            if count > options['recipes']:
+                continue
+            # fetched once, only serialization is timed
+            recipes = list(queryset.filter(user=user)[:count])
+
+            def drf():
+                return serializer_class(
+                    recipes, many=True, context=context
+                ).data
+
+            def compiled():
+                represent = compile_serializer(
+                    serializer_class(context=context)
+                )
+                return [represent(recipe) for recipe in recipes]
+
+            if render(compiled()) != render(drf()):
+                raise CommandError(
+                    f"{serializer_class.__name__}: compiled JSON differs"
+                )
+            drf_ms = timeit(drf, options['repeat'])
+            compiled_ms = timeit(compiled, options['repeat'])
+            name = "detail" if serializer_class is RecipeDetailSerializer \
+                else "list"
+            command.stdout.write(
+                f"{name:>10} {count:>8} {drf_ms:>10.2f} "
+                f"{compiled_ms:>14.2f} {drf_ms / compiled_ms:>7.1f}x"
+            )
+            check_budget(f"{name} of {count}", compiled_ms, options)
+
+
+@scenario
+def render(command, options):
+    """JSON VS ORJSON RENDERING AND PARSING OF RECIPE LIST PAGES"""
+    user = seed(options['recipes'])
+    context = {'request': RequestFactory().get('/api/recipe/recipes/')}
+    represent = compile_serializer(RecipeSerializer(context=context))
+    recipes = Recipe.objects.for_list().filter(user=user)
+
+    command.stdout.write(
+        f"{'page':>6} {'json (ms)':>10} {'orjson (ms)':>12} "
+        f"{'parse json':>11} {'parse orjson':>13}"
+    )
+    for size in (50, 500, 10000):
+        if size > options['recipes']:
+            continue
+        page = {'next': None, 'previous': None,
+                'results': [represent(recipe) for recipe in recipes[:size]]}
+        body = JSONRenderer().render(page)
+        if ORJSONRenderer().render(page) != body:
+            raise CommandError(f"page of {size}: orjson JSON differs")
+        results = [
+            timeit(lambda: renderer().render(page), options['repeat'])
+            for renderer in (JSONRenderer, ORJSONRenderer)
+        ] + [
+            timeit(lambda: parser().parse(io.BytesIO(body)),
+                   options['repeat'])
+            for parser in (JSONParser, ORJSONParser)
+        ]
+        command.stdout.write(
+            f"{size:>6} {results[0]:>10.2f} {results[1]:>12.2f} "
+            f"{results[2]:>11.2f} {results[3]:>13.2f}"
+        )
+        check_budget(f"page of {size}", results[1], options)
+
+
+class Command(BaseCommand):
+    """DJANGO COMMAND TO TIME THE HOT RECIPE QUERIES ON SEEDED DATA"""
+    help = "Seed a throwaway recipe book and time a query scenario."
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--budget-ms', type=float, default=None,
+                            help="Fail if a median is over this latency.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            SCENARIOS[options['scenario']](self, options)
+            transaction.set_rollback(True)
@@ -0,0 +1,155 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.caching import response_cache
+from recipe.management.commands.benchmark import seed
+
+# Below this, tables (e.g. the 3 collection versions of each user) are
+# a page or two and a full scan is the cheapest plan: the check would
+# fail on seed size rather than on a missing index
+MIN_RECIPES = 200
+MIN_USERS = 5
+
+
+def hot_paths(user):
+    """(LABEL, URL, QUERY PARAMS) OF EVERY HOT READ ENDPOINT"""
+    tag_ids = list(
+        Tag.objects.filter(user=user).values_list('id', flat=True)[:3]
+    )
+    tags = ','.join(str(pk) for pk in tag_ids)
+    recipe = Recipe.objects.filter(user=user).first()
+    return [
+        ("recipe list", reverse('recipe:recipe-list'), {}),
+        ("recipe tags filter", reverse('recipe:recipe-list'),
+         {'tags': tags}),
+        ("recipe tags filter, all", reverse('recipe:recipe-list'),
+         {'tags': tags, 'tags_mode': 'all'}),
+        ("recipe search", reverse('recipe:recipe-list'), {'q': "chicken"}),
+        ("recipe detail",
+         reverse('recipe:recipe-detail', args=[recipe.id]), {}),
+        ("tag list", reverse('recipe:tag-list'), {}),
+        ("tag list, assigned only", reverse('recipe:tag-list'),
+         {'assigned_only': 1}),
+        ("tag suggest", reverse('recipe:tag-suggest'), {'q': "chi"}),
+        ("ingredient list", reverse('recipe:ingredient-list'), {}),
+        ("ingredient list, assigned only",
+         reverse('recipe:ingredient-list'), {'assigned_only': 1}),
+    ]
+
+
+def sequential_scans(sql):
+    """NAMES OF THE TABLES THE PLAN OF sql READS WITH A FULL SCAN"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return postgresql_seq_scans(plan[0]['Plan'])
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+            return sqlite_full_scans(
+                [detail for *_, detail in cursor.fetchall()], sql
+            )
+    raise CommandError(
+        f"Query plans can't be checked on {connection.vendor}"
+    )
+
+
+def sqlite_full_scans(details, sql):
+    """TABLES READ IN FULL, FROM THE DETAIL LINES OF A SQLITE PLAN
+
+    SCAN <table> USING [COVERING] INDEX reads the whole index, and is
+    reported too, unless it is how a LIMITed query gets its rows in
+    ORDER BY order: then the scan stops after LIMIT rows.
+    """
+    ordered = ' ORDER BY ' in sql and ' LIMIT ' in sql and not any(
+        detail.startswith('USE TEMP B-TREE FOR ORDER BY')
+        for detail in details
+    )
+    return [
+        detail.split()[1] for detail in details
+        if detail.startswith('SCAN ')
+        and not (ordered and ' USING ' in detail)
+        and ' VIRTUAL TABLE INDEX ' not in detail
+        and not detail.startswith('SCAN CONSTANT ROW')
+    ]
+
+
+def postgresql_seq_scans(node):
+    scans = [node['Relation Name']] if node['Node Type'] == 'Seq Scan' \
+        else []
+    for child in node.get('Plans', ()):
+        scans += postgresql_seq_scans(child)
+    return scans
+
+
+class Command(BaseCommand):
+    """DJANGO COMMAND TO FAIL WHEN A HOT QUERY PLANS A SEQUENTIAL SCAN"""
+    help = "Seed a throwaway dataset, EXPLAIN the SQL of every hot read " \
+           "endpoint and fail if any of it scans a whole table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=2000,
+                            help=f"Recipes per seeded user, at least "
+                                 f"{MIN_RECIPES}.")
+        parser.add_argument('--users', type=int, default=5,
+                            help=f"Seeded users, so user filters are "
+                                 f"selective as in production; at "
+                                 f"least {MIN_USERS}.")
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help="Print the SQL of every checked query.")
+
+    def handle(self, *args, **options):
+        if options['recipes'] < MIN_RECIPES or options['users'] < MIN_USERS:
+            raise CommandError(
+                f"Seed at least {MIN_RECIPES} recipes for each of "
+                f"{MIN_USERS} users, the planners rightly scan smaller "
+                f"tables."
+            )
+        # the seeded rows never commit, so only the primary can see them
+        with override_settings(DATABASE_REPLICAS=[]), transaction.atomic():
+            failures = self.check_plans(options)
+            transaction.set_rollback(True)
+
+        if failures:
+            raise CommandError(
+                f"{failures} hot queries plan a sequential scan."
+            )
+        self.stdout.write("No hot query plans a sequential scan.")
+
+    def check_plans(self, options):
+        users = [seed(options['recipes']) for _ in range(options['users'])]
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        response_cache().clear()
+
+        client = APIClient()
+        client.force_authenticate(users[0])
+        failures = 0
+        for label, url, params in hot_paths(users[0]):
+            with CaptureQueriesContext(connection) as queries, \
+                    override_settings(ALLOWED_HOSTS=['testserver']):
+                res = client.get(url, params)
+            if res.status_code != 200:
+                raise CommandError(f"{label}: HTTP {res.status_code}")
+            for query in queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                scans = sequential_scans(sql)
+                if scans:
+                    failures += 1
+                    self.stdout.write(
+                        f"FAIL {label}: scans {', '.join(scans)}\n  {sql}"
+                    )
+                elif options['verbose_plans']:
+                    self.stdout.write(f"ok   {label}\n  {sql}")
+            self.stdout.write(f"checked {label}")
+        return failures
@@ -0,0 +1,142 @@
+import threading
+import time
+from statistics import median
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from core.models import CollectionVersion
+from recipe.management.commands.benchmark import seed
+
+
+def request(app, environ):
+    """RUN ONE REQUEST THROUGH THE WSGI app, RETURN ITS STATUS LINE"""
+    status = []
+    response = app(dict(environ),
+                   lambda line, headers, exc_info=None: status.append(line))
+    try:
+        b''.join(response)
+    finally:
+        # sends request_finished, which closes or keeps the connection
+        response.close()
+    return status[0]
+
+
+def run(app, environ, requests, threads):
+    """SPREAD requests OVER threads WORKERS, RETURN THE LATENCIES IN MS"""
+    latencies, errors = [], []
+
+    def worker(count):
+        try:
+            for _ in range(count):
+                start = time.perf_counter()
+                status = request(app, environ)
+                latencies.append((time.perf_counter() - start) * 1000)
+                if not status.startswith('200'):
+                    errors.append(status)
+        finally:
+            connections.close_all()
+
+    workers = [
+        threading.Thread(target=worker, args=(requests // threads,))
+        for _ in range(threads)
+    ]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if errors:
+        raise CommandError(f"{len(errors)} requests failed: {errors[0]}")
+    return latencies
+
+
+def percentile(samples, percent):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, len(ordered) * percent // 100)]
+
+
+class Command(BaseCommand):
+    """DJANGO COMMAND TO MEASURE PER-REQUEST LATENCY UNDER THREADED LOAD"""
+    help = "Seed a recipe book, then request an endpoint from a set of " \
+           "threads, like the workers of a threaded server, once for each " \
+           "--conn-max-age. Run it again with DB_POOL_SIZE set to compare " \
+           "with the connection pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000,
+                            help="Requests per round.")
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--recipes', type=int, default=200)
+        parser.add_argument('--path', default=None,
+                            help="Endpoint to request, the recipe list "
+                                 "by default.")
+        parser.add_argument('--conn-max-age', type=int, nargs='+',
+                            default=None,
+                            help="CONN_MAX_AGE of each round, 0 and the "
+                                 "configured value by default.")
+
+    def handle(self, *args, **options):
+        db = connections.databases[DEFAULT_DB_ALIAS]
+        ages = options['conn_max_age'] or sorted({0, db['CONN_MAX_AGE']})
+        user = seed(options['recipes'])
+        token = Token.objects.create(user=user)
+        connections.close_all()
+
+        environ = {
+            'PATH_INFO': options['path'] or reverse('recipe:recipe-list'),
+            'HTTP_AUTHORIZATION': f"Token {token.key}",
+        }
+        setup_testing_defaults(environ)
+        app = WSGIHandler()
+        configured_age = db['CONN_MAX_AGE']
+        # without the response cache every request runs its queries
+        try:
+            with override_settings(
+                ALLOWED_HOSTS=[environ['HTTP_HOST']],
+                CACHES=dict(settings.CACHES, loadtest={
+                    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+                }),
+                RESPONSE_CACHE=dict(settings.RESPONSE_CACHE,
+                                    CACHE_ALIAS='loadtest'),
+                # a single user would soon be throttled
+                REST_FRAMEWORK=dict(settings.REST_FRAMEWORK,
+                                    DEFAULT_THROTTLE_RATES={}),
+            ):
+                request(app, environ)
+                self.report(app, environ, ages, db, options)
+        finally:
+            db['CONN_MAX_AGE'] = configured_age
+            connections.close_all()
+            with transaction.atomic():
+                user_id = user.pk
+                user.delete()
+                # the recipe delete signals bump the versions again
+                CollectionVersion.objects.filter(user_id=user_id).delete()
+
+    def report(self, app, environ, ages, db, options):
+        pooled = db['ENGINE'] == 'core.backends.postgresql_pool'
+        self.stdout.write(
+            f"{db['ENGINE']}, {options['threads']} threads"
+            + (f", pool of {db['POOL_SIZE']}" if pooled else "")
+        )
+        self.stdout.write(
+            f"{'CONN_MAX_AGE':>12} {'p50 (ms)':>10} {'p95 (ms)':>10} "
+            f"{'req/s':>8}"
+        )
+        for age in ages:
+            db['CONN_MAX_AGE'] = age
+            start = time.perf_counter()
+            latencies = run(app, environ, options['requests'],
+                            options['threads'])
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{age:>12} {median(latencies):>10.2f} "
+                f"{percentile(latencies, 95):>10.2f} "
+                f"{len(latencies) / elapsed:>8.0f}"
+            )
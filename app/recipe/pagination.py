@@ -0,0 +1,25 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class RecipeAttrCursorPagination(CursorPagination):
+    """KEYSET PAGINATION FOR TAGS AND INGREDIENTS"""
+    ordering = ('-name', 'id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+
+class RecipeCursorPagination(CursorPagination):
+    """KEYSET PAGINATION FOR RECIPES, NEWEST FIRST
+
+    Search results (annotated with a rank) come best match first.
+    """
+    ordering = ('-id',)
+    search_ordering = ('-rank', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_PAGE_SIZE
+
+    def get_ordering(self, request, queryset, view):
+        if 'rank' in queryset.query.annotations:
+            return self.search_ordering
+        return super().get_ordering(request, queryset, view)
@@ -1,29 +1,110 @@
 from core.models import Tag, Ingredient, Recipe
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from recipe.images import variant_urls
+from recipe.uploads import StoredUploadedFile
+
+
+class UserPrimaryKeysField(serializers.ManyRelatedField):
+    """A LIST OF PRIMARY KEYS RESOLVED WITH ONE id__in QUERY"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        pks, errors = [], []
+        for item in data:
+            try:
+                pks.append(self.child_relation.to_pk(item))
+            except serializers.ValidationError as exc:
+                errors.extend(exc.detail)
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        found = self.child_relation.get_queryset().in_bulk(set(pks))
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            raise serializers.ValidationError([
+                self.child_relation.error_messages['does_not_exist']
+                .format(pk_value=pk) for pk in missing
+            ])
+        return [found[pk] for pk in pks]
+
+
+class UserPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PRIMARY KEY OF AN OBJECT OWNED BY THE REQUESTING USER
+
+    With many=True the whole list is looked up in a single query.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return UserPrimaryKeysField(**list_kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        request = self.context.get('request')
+        if request is None:
+            return queryset
+        return queryset.filter(user=request.user)
+
+    def to_pk(self, data):
+        """VALIDATE THE TYPE OF ONE SUBMITTED PRIMARY KEY"""
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
 
 
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
-        fields = ("id", "name")
-        read_only_fields = ('id',)
+        fields = ("id", "name", "recipe_count")
+        read_only_fields = ('id', 'recipe_count')
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
-        fields = ("id", "name")
-        read_only_fields = ('id',)
+        fields = ("id", "name", "recipe_count")
+        read_only_fields = ('id', 'recipe_count')
 
 
 class RecipeSerializer(serializers.ModelSerializer):
-    ingredients = serializers.\
-        PrimaryKeyRelatedField(many=True,
-                               queryset=Ingredient.objects.all())
+    ingredients = UserPrimaryKeyRelatedField(
+        many=True, queryset=Ingredient.objects.all()
+    )
 
-    tags = serializers.\
-        PrimaryKeyRelatedField(many=True,
-                               queryset=Tag.objects.all())
+    tags = UserPrimaryKeyRelatedField(
+        many=True, queryset=Tag.objects.all()
+    )
+
+    class Meta:
+        model = Recipe
+        fields = ("id", "title", 'ingredients', 'tags',
+                  "time_minutes", "price", "link")
+        read_only_fields = ('id',)
+
+
+class RecipeBulkSerializer(serializers.ModelSerializer):
+    """VALIDATE ONE ITEM OF A BULK WRITE, RELATED IDS ARE CHECKED IN BULK"""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(), required=False
+    )
 
     class Meta:
         model = Recipe
@@ -36,17 +117,35 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
     """SERIALZE THE RECIPE DETAIL"""
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    img_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ("id", "title", 'ingredients', 'tags',
-                  "time_minutes", "price", "link")
-        read_only_fields = ('id',)
+                  "time_minutes", "price", "link",
+                  'img', 'img_status', 'img_variants')
+        read_only_fields = ('id', 'img', 'img_status')
+
+    def get_img_variants(self, recipe):
+        return variant_urls(recipe)
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """SERIALIZER FOR UPLOAD IMG"""
+    img_variants = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'img', )
-        read_only_fields = ('id',)
+        fields = ('id', 'img', 'img_status', 'img_variants')
+        read_only_fields = ('id', 'img_status')
+
+    def get_img_variants(self, recipe):
+        return variant_urls(recipe)
+
+    def update(self, instance, validated_data):
+        img = validated_data.get('img')
+        if isinstance(img, StoredUploadedFile):
+            # already streamed to its final path, only record the name
+            img.close()
+            validated_data['img'] = img.stored_name
+        return super().update(instance, validated_data)
@@ -0,0 +1,121 @@
+from django.utils import timezone
+
+from core import search
+from core.models import Ingredient, Recipe, Tag
+from recipe.caching import RECIPES, TAGS, INGREDIENTS, KINDS, \
+    bump_versions
+
+
+def recipe_changed(sender, instance, **kwargs):
+    search.index_recipes([instance.pk])
+    bump_versions(instance.user_id, RECIPES)
+
+
+def remember_recipe_links(sender, instance, **kwargs):
+    """KEEP THE TAGS/INGREDIENTS OF A RECIPE ABOUT TO BE DELETED"""
+    instance._unlinked = {
+        Tag: list(instance.tags.values_list('id', flat=True)),
+        Ingredient: list(instance.ingredients.values_list('id', flat=True)),
+    }
+
+
+def recipe_deleted(sender, instance, **kwargs):
+    search.index_recipes([instance.pk])
+    for model, pks in instance.__dict__.pop('_unlinked', {}).items():
+        model.objects.filter(pk__in=pks).refresh_recipe_counts()
+    # the deleted links also change which tags/ingredients are assigned
+    bump_versions(instance.user_id, *KINDS)
+
+
+def tag_changed(sender, instance, **kwargs):
+    bump_versions(instance.user_id, TAGS)
+
+
+def ingredient_changed(sender, instance, **kwargs):
+    bump_versions(instance.user_id, INGREDIENTS)
+
+
+def recount_saved(sender, instance, created, **kwargs):
+    """UNDO A STALE recipe_count WRITTEN BACK BY A FULL save()"""
+    if not created:
+        sender.objects.filter(pk=instance.pk).refresh_recipe_counts()
+
+
+def recount_relinked(model, instance, action, reverse, pk_set):
+    """KEEP recipe_count OF THE (UN)LINKED TAGS/INGREDIENTS"""
+    cleared = f"_cleared_{model._meta.model_name}"
+    if reverse:
+        if action.startswith('post_'):
+            model.objects.filter(pk=instance.pk).refresh_recipe_counts()
+    elif action == 'pre_clear':
+        setattr(instance, cleared, list(
+            model.objects.filter(recipe=instance).values_list('id', flat=True)
+        ))
+    elif action == 'post_clear':
+        model.objects.filter(pk__in=instance.__dict__.pop(cleared, ())) \
+            .refresh_recipe_counts()
+    elif action.startswith('post_'):
+        model.objects.filter(pk__in=pk_set or ()).refresh_recipe_counts()
+
+
+def remember_linked_recipes(sender, instance, **kwargs):
+    """KEEP THE RECIPES OF A TAG/INGREDIENT ABOUT TO BE DELETED"""
+    instance._linked_recipes = search.linked_recipe_ids(
+        sender, [instance.pk]
+    )
+
+
+def index_linked_recipes(sender, instance, created=False, **kwargs):
+    """REINDEX THE RECIPES OF A RENAMED OR DELETED TAG/INGREDIENT"""
+    if created:
+        return
+    recipe_ids = instance.__dict__.pop('_linked_recipes', None)
+    if recipe_ids is None:
+        recipe_ids = search.linked_recipe_ids(sender, [instance.pk])
+    search.index_recipes(recipe_ids)
+
+
+def index_relinked_recipes(instance, action, reverse, pk_set):
+    """REINDEX THE RECIPES WHOSE TAGS/INGREDIENTS WERE (UN)LINKED"""
+    if not reverse:
+        if action.startswith('post_'):
+            search.index_recipes([instance.pk])
+    elif action == 'pre_clear':
+        instance._linked_recipes = search.linked_recipe_ids(
+            type(instance), [instance.pk]
+        )
+    elif action == 'post_clear':
+        search.index_recipes(instance.__dict__.pop('_linked_recipes', ()))
+    elif action.startswith('post_'):
+        search.index_recipes(pk_set or ())
+
+
+def touch_recipes(instance, reverse, pk_set):
+    """STAMP updated_at ON THE RECIPES WHOSE LINKS CHANGED"""
+    recipes = Recipe.objects.filter(pk__in=pk_set) if reverse \
+        else Recipe.objects.filter(pk=instance.pk)
+    recipes.update(updated_at=timezone.now())
+
+
+def recipe_tags_changed(sender, instance, action, reverse, pk_set,
+                        **kwargs):
+    index_relinked_recipes(instance, action, reverse, pk_set)
+    recount_relinked(Tag, instance, action, reverse, pk_set)
+    if action.startswith('post_'):
+        touch_recipes(instance, reverse, pk_set or ())
+        bump_versions(instance.user_id, RECIPES, TAGS)
+
+
+def recipe_ingredients_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    index_relinked_recipes(instance, action, reverse, pk_set)
+    recount_relinked(Ingredient, instance, action, reverse, pk_set)
+    if action.startswith('post_'):
+        touch_recipes(instance, reverse, pk_set or ())
+        bump_versions(instance.user_id, RECIPES, INGREDIENTS)
+
+
+def user_created(sender, instance, created, **kwargs):
+    # start from fresh versions in case the id was used before
+    if created:
+        bump_versions(instance.pk, *KINDS)
@@ -0,0 +1,62 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+
+from recipe.management.commands.check_query_plans import sqlite_full_scans
+
+
+class CheckQueryPlansCommandTest(TestCase):
+    multi_db = True
+
+    def test_hot_paths_use_indexes(self):
+        """TEST NO HOT READ ENDPOINT PLANS A SEQUENTIAL SCAN"""
+        out = StringIO()
+
+        call_command('check_query_plans', recipes=200, users=5, stdout=out)
+
+        self.assertIn("No hot query plans a sequential scan.",
+                      out.getvalue())
+        self.assertIn("checked tag suggest", out.getvalue())
+
+    @override_settings(DATABASE_REPLICAS=['sqlite'])
+    def test_replicas_ignored(self):
+        """TEST THE UNCOMMITTED SEED IS READ FROM THE PRIMARY"""
+        # no replica pin left by other tests for a reused user id
+        cache.clear()
+        out = StringIO()
+
+        call_command('check_query_plans', recipes=200, users=5, stdout=out)
+
+        self.assertIn("No hot query plans a sequential scan.",
+                      out.getvalue())
+
+    def test_seed_too_small_refused(self):
+        with self.assertRaises(CommandError):
+            call_command('check_query_plans', recipes=300, users=1,
+                         stdout=StringIO())
+
+    def test_sqlite_full_index_scan_reported(self):
+        """TEST A SCAN USING A COVERING INDEX IS A FULL SCAN"""
+        details = [
+            "SCAN core_tag USING COVERING INDEX core_tag_user_id_1b670500",
+            "SEARCH core_recipe_tags USING INDEX tags_idx (tag_id=?)",
+            "SCAN core_collectionversion",
+        ]
+
+        self.assertEqual(
+            sqlite_full_scans(details, "SELECT * FROM core_tag"),
+            ['core_tag', 'core_collectionversion']
+        )
+
+    def test_sqlite_ordered_index_scan_with_limit_allowed(self):
+        sql = "SELECT * FROM core_tag ORDER BY name LIMIT 51"
+        details = ["SCAN core_tag USING INDEX tag_name_idx"]
+
+        self.assertEqual(sqlite_full_scans(details, sql), [])
+        self.assertEqual(
+            sqlite_full_scans(details + ["USE TEMP B-TREE FOR ORDER BY"],
+                              sql),
+            ['core_tag']
+        )
@@ -0,0 +1,83 @@
+from core.models import Recipe, Tag, Ingredient
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from recipe.compiled import compile_serializer
+from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+RECIPE_URL = reverse("recipe:recipe-list")
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class CompiledSerializerTests(TestCase):
+    """TEST THE COMPILED PATH RENDERS THE SAME JSON AS THE SERIALIZERS"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "compiled@recipe.com",
+            'recipetestpassword'
+        )
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ("Vegan", "Dessert")]
+        ingredient = Ingredient.objects.create(user=self.user, name="Lime")
+        self.plain = Recipe.objects.create(
+            user=self.user, title="Pie", time_minutes=5, price="5.1"
+        )
+        self.full = Recipe.objects.create(
+            user=self.user, title="Cake", time_minutes=40, price=12,
+            link="https://example.com/cake", img="uploads/recipe/cake.jpg",
+            img_status=Recipe.IMG_READY
+        )
+        self.full.tags.add(*tags)
+        self.full.ingredients.add(ingredient)
+        self.context = {'request': RequestFactory().get(RECIPE_URL)}
+
+    def assertSameJSON(self, serializer_class, queryset):
+        render = JSONRenderer().render
+        for recipe in queryset:
+            serializer = serializer_class(context=self.context)
+            self.assertEqual(
+                render(compile_serializer(serializer)(recipe)),
+                render(serializer_class(recipe, context=self.context).data)
+            )
+
+    def test_list_fields(self):
+        self.assertSameJSON(RecipeSerializer, Recipe.objects.for_list())
+
+    def test_detail_fields(self):
+        self.assertSameJSON(RecipeDetailSerializer,
+                            Recipe.objects.for_detail())
+
+    def test_without_prefetch(self):
+        self.assertSameJSON(RecipeDetailSerializer, Recipe.objects.all())
+
+    def test_list_response(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(RECIPE_URL)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+        self.assertEqual(
+            res.content,
+            JSONRenderer().render({
+                'next': None, 'previous': None,
+                'results': RecipeSerializer(recipes, many=True).data
+            })
+        )
+
+    def test_detail_response(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        res = client.get(detail_url(self.full.id))
+
+        request = RequestFactory().get(detail_url(self.full.id))
+        serializer = RecipeDetailSerializer(self.full,
+                                            context={'request': request})
+        self.assertEqual(res.content, JSONRenderer().render(serializer.data))
@@ -0,0 +1,99 @@
+import csv
+import io
+import json
+
+from core.models import Recipe, Tag, Ingredient
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from recipe.serializers import RecipeDetailSerializer
+from rest_framework import status
+from rest_framework.test import APIClient
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+class RecipeExportTests(TestCase):
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "export@recipe.com",
+            'recipetestpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ("Vegan", "Quick")]
+        lime = Ingredient.objects.create(user=self.user, name="Lime")
+        self.recipes = []
+        for i in range(5):
+            recipe = Recipe.objects.create(
+                user=self.user, title=f"Recipe {i}", time_minutes=i,
+                price="5.10"
+            )
+            recipe.tags.add(*tags[:i % 3])
+            recipe.ingredients.add(lime)
+            self.recipes.append(recipe)
+        other = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        Recipe.objects.create(user=other, title="Not mine", time_minutes=1,
+                              price=1)
+
+    def test_export_ndjson(self):
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'],
+                         'application/x-ndjson; charset=utf-8')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        request = RequestFactory().get(EXPORT_URL)
+        expected = RecipeDetailSerializer(
+            Recipe.objects.filter(user=self.user).order_by('id'),
+            many=True, context={'request': request}
+        ).data
+        self.assertEqual([json.loads(line) for line in lines],
+                         json.loads(json.dumps(expected)))
+
+    def test_export_csv(self):
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('recipes.csv', res['Content-Disposition'])
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([row['title'] for row in rows],
+                         [f"Recipe {i}" for i in range(5)])
+        self.assertEqual(rows[2]['tags'], "Vegan;Quick")
+        self.assertEqual(rows[2]['ingredients'], "Lime")
+        self.assertEqual(rows[2]['price'], "5.10")
+        self.assertEqual(rows[2]['img'], "")
+
+    def test_export_empty_csv_has_header(self):
+        Recipe.objects.filter(user=self.user).delete()
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(
+            b''.join(res.streaming_content),
+            b'id,title,time_minutes,price,link,tags,ingredients,img\r\n'
+        )
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_queries_per_chunk(self):
+        """TEST ONE CURSOR, WITH TAGS AND INGREDIENTS PREFETCHED PER CHUNK"""
+        res = self.client.get(EXPORT_URL)
+
+        # 5 recipes make 3 chunks
+        with self.assertNumQueries(1 + 3 * 2):
+            lines = b''.join(res.streaming_content).splitlines()
+
+        self.assertEqual(len(lines), 5)
+
+    def test_login_required(self):
+        self.client.force_authenticate(None)
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
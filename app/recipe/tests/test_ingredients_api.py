@@ -7,6 +7,7 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
+INGREDIENTS_SUGGEST_URL = reverse("recipe:ingredient-suggest")
 
 
 class PublicIngredientsAPITest(TestCase):
@@ -38,7 +39,7 @@ class PrivateIngredientsAPITest(TestCase):
         ingredients = Ingredient.objects.all().order_by("-name")
         serializer = IngredientSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_ingredient_limited_to_user(self):
         """TEST THAT ONLY INGREDIENTS FOR
@@ -54,9 +55,9 @@ class PrivateIngredientsAPITest(TestCase):
 
         res = self.client.get(INGREDIENTS_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
 
-        self.assertEqual(res.data[0]['name'], ingredient.name)
+        self.assertEqual(res.data['results'][0]['name'], ingredient.name)
 
     def test_create_ingredient_sucessful(self):
         ingredient_payload = {"name": "Cabbage"}
@@ -94,6 +95,7 @@ class PrivateIngredientsAPITest(TestCase):
         )
 
         recipe.ingredients.add(ingredient1)
+        ingredient1.refresh_from_db()
 
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -101,8 +103,8 @@ class PrivateIngredientsAPITest(TestCase):
         serializer1 = IngredientSerializer(ingredient1)
         serializer2 = IngredientSerializer(ingredient2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_ingredient_assigned_unique(self):
         Ingredient.objects.create(
@@ -136,4 +138,28 @@ class PrivateIngredientsAPITest(TestCase):
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_suggest_ingredients(self):
+        Ingredient.objects.create(user=self.user, name="Cupuaçu")
+        Ingredient.objects.create(user=self.user, name="Cumin")
+        Ingredient.objects.create(user=self.user, name="Bacuri")
+
+        res = self.client.get(INGREDIENTS_SUGGEST_URL, {'q': "cu"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [ingredient['name'] for ingredient in res.data],
+            ["Cumin", "Cupuaçu", "Bacuri"]
+        )
+
+    def test_create_ingredient_idempotent(self):
+        ingredient = Ingredient.objects.create(user=self.user, name="Salt")
+
+        res = self.client.post(INGREDIENTS_URL, {'name': "salt"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['id'], ingredient.id)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 1
+        )
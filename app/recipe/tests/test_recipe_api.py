@@ -1,16 +1,25 @@
 import os
+import struct
 import tempfile
 
 from PIL import Image
-from core.models import Recipe, Tag, Ingredient
+from core.models import ImageBlob, Recipe, Tag, Ingredient
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, TestCase, override_settings
 from django.urls import reverse
+from recipe.caching import response_cache
+from recipe.images import process_recipe_image, variant_path
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 from rest_framework import status
 from rest_framework.test import APIClient
 
 RECIPE_URL = reverse("recipe:recipe-list")
+RECIPE_BULK_URL = reverse("recipe:recipe-bulk")
+TAG_URL = reverse("recipe:tag-list")
+INGREDIENT_URL = reverse("recipe:ingredient-list")
 
 
 def image_upload_url(recipe_id):
@@ -38,6 +47,26 @@ def sample_ingredient(user, name="Garlic"):
     return Ingredient.objects.create(user=user, name=name)
 
 
+def sample_exif(orientation):
+    """RAW EXIF OF A PHONE PHOTO: ORIENTATION AND A GPS LATITUDE REF
+
+    Built by hand as PIL.Image.Exif only exists from Pillow 6.
+    """
+    # little endian TIFF header, IFD0 right after it
+    tiff = b'II*\x00' + struct.pack('<I', 8)
+    # IFD0: Orientation (SHORT) and the offset of the GPS IFD (LONG)
+    gps_offset = 8 + 2 + 2 * 12 + 4
+    tiff += struct.pack('<H', 2)
+    tiff += struct.pack('<HHIHH', 0x0112, 3, 1, orientation, 0)
+    tiff += struct.pack('<HHII', 0x8825, 4, 1, gps_offset)
+    tiff += struct.pack('<I', 0)
+    # GPS IFD: GPSLatitudeRef 'N'
+    tiff += struct.pack('<H', 1)
+    tiff += struct.pack('<HHI', 0x0001, 2, 2) + b'N\x00\x00\x00'
+    tiff += struct.pack('<I', 0)
+    return b'Exif\x00\x00' + tiff
+
+
 def detail_url(recupe_id):
     """RETURN THE RECIPE DETAILS URK"""
     return reverse('recipe:recipe-detail', args=[recupe_id])
@@ -73,7 +102,7 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_view_details(self):
         recipe = sample_recipe(self.user)
@@ -149,6 +178,26 @@ class PrivateRecipeApiTest(TestCase):
         self.assertIn(ingredient1, ingredients)
         self.assertIn(ingredient2, ingredients)
 
+    def test_add_recipe_with_other_users_tag_rejected(self):
+        other_user = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        foreign_tag = sample_tag(other_user, name="Foreign")
+
+        recipe_payload = {
+            'title': "Avocado cake",
+            'tags': [foreign_tag.id, 0],
+            'time_minutes': 60,
+            'price': 5.00
+        }
+
+        res = self.client.post(RECIPE_URL, recipe_payload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(res.data['tags']), 2)
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
     def test_partial_update_recipe(self):
         """TEST UPDATE A RECIPE WITH PATCH"""
 
@@ -217,8 +266,8 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_filter_recipe_by_tag(self):
         rcp1 = sample_recipe(self.user, title="Açai com granola")
@@ -245,9 +294,9 @@ class PrivateRecipeApiTest(TestCase):
         serializer2 = RecipeSerializer(rcp2)
         serializer3 = RecipeSerializer(rcp3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
 
     def test_filter_recipe_by_ingredient(self):
         rcp1 = sample_recipe(self.user, title="Açai puro")
@@ -274,9 +323,174 @@ class PrivateRecipeApiTest(TestCase):
         serializer2 = RecipeSerializer(rcp2)
         serializer3 = RecipeSerializer(rcp3)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
-        self.assertNotIn(serializer3.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
+        self.assertNotIn(serializer3.data, res.data['results'])
+
+    def test_filter_recipe_by_tags_returns_unique(self):
+        """TEST THAT A RECIPE MATCHING SEVERAL TAGS IS RETURNED ONCE"""
+        recipe = sample_recipe(self.user, title="Tacacá")
+        tag1 = sample_tag(self.user, name="Paraense")
+        tag2 = sample_tag(self.user, name="Sopa")
+        recipe.tags.add(tag1, tag2)
+        recipe.ingredients.add(sample_ingredient(self.user, name="Jambu"))
+
+        res = self.client.get(
+            RECIPE_URL,
+            {
+                'tags': f"{tag1.id},{tag2.id}",
+                'ingredients': f"{recipe.ingredients.get().id}",
+            }
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_filter_recipe_by_all_tags(self):
+        """TEST THAT tags_mode=all ONLY RETURNS RECIPES WITH EVERY TAG"""
+        rcp1 = sample_recipe(self.user, title="Tacacá")
+        rcp2 = sample_recipe(self.user, title="Caruru")
+
+        tag1 = sample_tag(self.user, name="Paraense")
+        tag2 = sample_tag(self.user, name="Sopa")
+
+        rcp1.tags.add(tag1, tag2)
+        rcp2.tags.add(tag1)
+
+        res = self.client.get(
+            RECIPE_URL,
+            {
+                'tags': f"{tag1.id},{tag2.id}",
+                'tags_mode': 'all'
+            }
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [rcp1.id]
+        )
+
+    def test_filter_recipe_invalid_params(self):
+        """TEST THAT MALFORMED FILTERS ARE REJECTED"""
+        res = self.client.get(RECIPE_URL, {'tags': 'one,two'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.get(RECIPE_URL, {'tags': '1', 'tags_mode': 'some'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipes_paginated_newest_first(self):
+        """TEST THAT RECIPES ARE PAGED WITH A CURSOR, NEWEST FIRST"""
+        rcp1 = sample_recipe(self.user, title="First")
+        rcp2 = sample_recipe(self.user, title="Second")
+        rcp3 = sample_recipe(self.user, title="Third")
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [rcp3.id, rcp2.id]
+        )
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [recipe['id'] for recipe in res.data['results']],
+            [rcp1.id]
+        )
+        self.assertIsNone(res.data['next'])
+
+
+class RecipeQueryCountTest(TestCase):
+    """PIN THE NUMBER OF QUERIES ISSUED BY EACH RECIPE ENDPOINT"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "queries@recipe.com",
+            'recipetestpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _create_recipes(self, count):
+        tag, _ = Tag.objects.get_or_create(user=self.user, name="Main Tag")
+        ingredient, _ = Ingredient.objects.get_or_create(
+            user=self.user, name="Garlic"
+        )
+        for i in range(count):
+            recipe = sample_recipe(self.user, title=f"Recipe {i}")
+            recipe.tags.add(tag)
+            recipe.ingredients.add(ingredient)
+        return recipe
+
+    def test_list_query_count_constant(self):
+        """LIST: 1 VERSION LOOKUP, 1 FOR RECIPES + 1 PER RELATION"""
+        self._create_recipes(1)
+        with self.assertNumQueries(4):
+            self.client.get(RECIPE_URL)
+
+        self._create_recipes(10)
+        with self.assertNumQueries(4):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 11)
+
+    def test_detail_query_count(self):
+        recipe = self._create_recipes(1)
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertEqual(len(res.data['ingredients']), 1)
+
+    def test_attr_list_query_count_constant(self):
+        """TAGS/INGREDIENTS: 1 VERSION LOOKUP, 1 FOR THE PAGE
+
+        recipe_count is a column and assigned_only an EXISTS subquery,
+        neither adds a query per row.
+        """
+        requests = [(url, params) for url in (TAG_URL, INGREDIENT_URL)
+                    for params in ({}, {'assigned_only': 1})]
+        self._create_recipes(1)
+        for url, params in requests:
+            response_cache().clear()
+            with self.assertNumQueries(2):
+                self.client.get(url, params)
+
+        self._create_recipes(10)
+        for i in range(10):
+            sample_tag(self.user, name=f"Tag {i}")
+            sample_ingredient(self.user, name=f"Ingredient {i}")
+        for url, params in requests:
+            response_cache().clear()
+            with self.assertNumQueries(2):
+                res = self.client.get(url, params)
+
+            self.assertEqual(len(res.data['results']), 1 if params else 11)
+
+    def test_related_ids_validated_in_one_query_per_relation(self):
+        request = RequestFactory().post(RECIPE_URL)
+        request.user = self.user
+        ingredients = [
+            sample_ingredient(self.user, name=f"Ingredient {i}").id
+            for i in range(40)
+        ]
+        payload = {
+            'title': "Feijoada",
+            'tags': [sample_tag(self.user).id],
+            'ingredients': ingredients,
+            'time_minutes': 240,
+            'price': 40,
+        }
+        serializer = RecipeSerializer(data=payload,
+                                      context={'request': request})
+
+        with self.assertNumQueries(2):
+            self.assertTrue(serializer.is_valid())
+
+        self.assertEqual(
+            [i.id for i in serializer.validated_data['ingredients']],
+            ingredients
+        )
 
 
 class RecipeImageUploadTest(TestCase):
@@ -291,6 +505,10 @@ class RecipeImageUploadTest(TestCase):
 
     def tearDown(self) -> None:
         """REMOVE TEMP FILES"""
+        if self.recipe.img:
+            storage = self.recipe.img.storage
+            for variant in ('small', 'large'):
+                storage.delete(variant_path(self.recipe.img.name, variant))
         self.recipe.img.delete()
 
     def test_upload_recipe_img(self):
@@ -314,3 +532,249 @@ class RecipeImageUploadTest(TestCase):
         res = self.client.post(url, {'img': 'not a img'}, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_processed_in_background(self):
+        """TEST THAT VARIANTS ARE RENDERED AND EXIF STRIPPED AFTER UPLOAD"""
+        url = image_upload_url(self.recipe.id)
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            img = Image.new("RGB", (20, 10))
+            img.save(ntf, format='JPEG', exif=sample_exif(6))
+            ntf.seek(0)
+            with Image.open(ntf) as uploaded:
+                self.assertEqual(uploaded._getexif(),
+                                 {0x0112: 6, 0x8825: {0x0001: 'N'}})
+            ntf.seek(0)
+
+            res = self.client.post(url, {'img': ntf}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['img_status'], Recipe.IMG_PENDING)
+        self.assertEqual(res.data['img_variants'], {})
+
+        self.assertEqual(process_recipe_image(self.recipe.id),
+                         Recipe.IMG_READY)
+        self.recipe.refresh_from_db()
+
+        with Image.open(self.recipe.img.path) as original:
+            self.assertEqual(original.size, (10, 20))
+            self.assertNotIn('exif', original.info)
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertEqual(res.data['img_status'], Recipe.IMG_READY)
+        self.assertEqual(set(res.data['img_variants']), {'small', 'large'})
+        self.assertTrue(os.path.exists(os.path.join(
+            os.path.dirname(self.recipe.img.path),
+            os.path.basename(variant_path(self.recipe.img.name, 'small'))
+        )))
+
+    def test_unreadable_image_marked_failed(self):
+        self.recipe.img.save('broken.jpg', ContentFile(b'not an image'))
+
+        with self.assertLogs('recipe.images', level='ERROR'):
+            self.assertEqual(process_recipe_image(self.recipe.id),
+                             Recipe.IMG_FAILED)
+
+    def test_same_image_stored_once(self):
+        """TEST THAT RE-UPLOADING THE SAME PHOTO REUSES THE STORED FILE"""
+        other = sample_recipe(self.user, title="Other")
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new("RGB", (10, 10)).save(ntf, format='JPEG')
+            for recipe in (self.recipe, other):
+                ntf.seek(0)
+                res = self.client.post(image_upload_url(recipe.id),
+                                       {'img': ntf}, format='multipart')
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.recipe.img.name, other.img.name)
+        self.assertEqual(
+            ImageBlob.objects.get(name=other.img.name).refcount, 2
+        )
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_oversized_upload_rejected(self):
+        url = image_upload_url(self.recipe.id)
+        upload = SimpleUploadedFile(
+            'big.jpg', b'\xff\xd8\xff' + b'0' * 200 * 1024
+        )
+
+        res = self.client.post(url, {'img': upload}, format='multipart')
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.img)
+
+    def test_non_image_stream_rejected_from_header(self):
+        url = image_upload_url(self.recipe.id)
+        upload = SimpleUploadedFile('fake.jpg', b'#!/bin/sh\necho hello\n')
+        upload_dir = os.path.join(settings.MEDIA_ROOT, 'uploads/recipe')
+        before = set(os.listdir(upload_dir)) \
+            if os.path.isdir(upload_dir) else set()
+
+        res = self.client.post(url, {'img': upload}, format='multipart')
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        after = set(os.listdir(upload_dir)) \
+            if os.path.isdir(upload_dir) else set()
+        self.assertEqual(before, after)
+
+
+class RecipeBulkApiTest(TestCase):
+    """TEST THE BATCH WRITE ENDPOINT FOR RECIPES"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "bulk@recipe.com",
+            'recipetestpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tag(self.user)
+        self.ingredient = sample_ingredient(self.user)
+
+    def test_bulk_create_recipes(self):
+        payload = [
+            {'title': f"Recipe {i}", 'time_minutes': 10, 'price': '5.00',
+             'tags': [self.tag.id], 'ingredients': [self.ingredient.id]}
+            for i in range(3)
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['ids']), 3)
+        recipes = Recipe.objects.filter(id__in=res.data['ids'])
+        self.assertEqual(recipes.count(), 3)
+        for recipe in recipes:
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(list(recipe.ingredients.all()),
+                             [self.ingredient])
+
+    def test_bulk_create_reports_item_errors(self):
+        """TEST THAT NOTHING IS WRITTEN WHEN AN ITEM IS INVALID"""
+        other_user = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        foreign_tag = sample_tag(other_user)
+        payload = [
+            {'title': "Good", 'time_minutes': 10, 'price': '5.00'},
+            {'title': "Foreign tag", 'time_minutes': 10, 'price': '5.00',
+             'tags': [foreign_tag.id]},
+            {'time_minutes': 10, 'price': '5.00'},
+        ]
+
+        res = self.client.post(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = res.data['errors']
+        self.assertEqual(errors[0], {})
+        self.assertIn('tags', errors[1])
+        self.assertIn('title', errors[2])
+        self.assertFalse(Recipe.objects.filter(user=self.user).exists())
+
+    def test_bulk_update_recipes(self):
+        rcp1 = sample_recipe(self.user, title="Old 1")
+        rcp2 = sample_recipe(self.user, title="Old 2")
+        rcp2.tags.add(self.tag)
+
+        payload = [
+            {'id': rcp1.id, 'title': "New 1", 'tags': [self.tag.id]},
+            {'id': rcp2.id, 'price': '7.50', 'tags': []},
+        ]
+        res = self.client.patch(RECIPE_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rcp1.refresh_from_db()
+        rcp2.refresh_from_db()
+        self.assertEqual(rcp1.title, "New 1")
+        self.assertEqual(list(rcp1.tags.all()), [self.tag])
+        self.assertEqual(rcp2.title, "Old 2")
+        self.assertEqual(str(rcp2.price), '7.50')
+        self.assertEqual(rcp2.tags.count(), 0)
+
+    def test_bulk_delete_recipes(self):
+        rcp1 = sample_recipe(self.user)
+        rcp2 = sample_recipe(self.user)
+        kept = sample_recipe(self.user)
+
+        res = self.client.delete(
+            RECIPE_BULK_URL, {'ids': [rcp1.id, rcp2.id]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 2)
+        self.assertEqual(
+            list(Recipe.objects.filter(user=self.user)), [kept]
+        )
+
+    def test_bulk_delete_rejects_boolean_ids(self):
+        recipe = sample_recipe(self.user)
+
+        res = self.client.delete(
+            RECIPE_BULK_URL, {'ids': [recipe.id, True]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_update_rejects_boolean_id(self):
+        sample_recipe(self.user)
+
+        res = self.client.patch(
+            RECIPE_BULK_URL, [{'id': True, 'title': "New"}], format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data['errors'][0])
+
+    def _linked_recipes(self, count, img):
+        recipes = []
+        for i in range(count):
+            recipe = sample_recipe(self.user, img=img)
+            recipe.tags.add(self.tag)
+            recipe.ingredients.add(self.ingredient)
+            recipes.append(recipe)
+        return [recipe.id for recipe in recipes]
+
+    def test_bulk_delete_query_count_constant(self):
+        """TEST COUNTS ARE ADJUSTED IN BULK, NOT PER DELETED RECIPE"""
+        for count, img in ((2, 'uploads/recipe/a.jpg'),
+                           (40, 'uploads/recipe/b.jpg')):
+            ids = self._linked_recipes(count, img)
+            kept = sample_recipe(self.user, img=img)
+            kept.tags.add(self.tag)
+
+            # ownership, savepoint pair, 2 per relation, images (2), the
+            # delete, 1 recount per relation, search index (2), versions
+            with self.assertNumQueries(15):
+                res = self.client.delete(RECIPE_BULK_URL, {'ids': ids},
+                                         format='json')
+
+            self.assertEqual(res.data['deleted'], count)
+            self.assertEqual(ImageBlob.objects.get(name=img).refcount, 1)
+            self.tag.refresh_from_db()
+            self.ingredient.refresh_from_db()
+            self.assertEqual(self.tag.recipe_count, 1)
+            self.assertEqual(self.ingredient.recipe_count, 0)
+            self.assertFalse(Recipe.objects.filter(id__in=ids).exists())
+            kept.delete()
+
+    def test_bulk_delete_other_users_recipe_rejected(self):
+        other_user = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        foreign = sample_recipe(other_user)
+
+        res = self.client.delete(
+            RECIPE_BULK_URL, {'ids': [foreign.id]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.filter(id=foreign.id).exists())
@@ -0,0 +1,147 @@
+import time
+from unittest.mock import patch
+
+from core.models import CollectionVersion, Recipe, Tag
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from recipe.caching import check_shared_cache
+from rest_framework.test import APIClient
+
+RECIPE_URL = reverse("recipe:recipe-list")
+TAG_URL = reverse("recipe:tag-list")
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ResponseCacheTests(TestCase):
+    """TEST THE PER-USER RESPONSE CACHE AND ETAGS"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "cache@recipe.com",
+            'recipetestpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title="Moqueca", time_minutes=40, price=30
+        )
+
+    def test_repeated_list_served_from_cache(self):
+        self.client.get(RECIPE_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], "Moqueca")
+
+    def test_stale_version_expires(self):
+        """TEST A VERSION CACHED BEFORE A BUMP IS NOT SERVED FOR GOOD"""
+        self.client.get(RECIPE_URL)
+        # bumped by another worker, or behind a reader that wrote the
+        # old version back: this cache still holds the old one
+        Recipe.objects.filter(id=self.recipe.id).update(title="Vatapá")
+        CollectionVersion.objects.filter(user=self.user) \
+            .update(version=F('version') + 1)
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['title'], "Moqueca")
+
+        later = time.time() + settings.RESPONSE_CACHE['VERSION_TIMEOUT'] + 1
+        with patch('time.time', return_value=later):
+            res = self.client.get(RECIPE_URL)
+        self.assertEqual(res.data['results'][0]['title'], "Vatapá")
+
+    def test_if_none_match_returns_304(self):
+        res = self.client.get(detail_url(self.recipe.id))
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(detail_url(self.recipe.id),
+                                  HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_write_invalidates_cached_responses(self):
+        res = self.client.get(detail_url(self.recipe.id))
+        etag = res['ETag']
+
+        tag = Tag.objects.create(user=self.user, name="Baiana")
+        self.recipe.tags.add(tag)
+
+        res = self.client.get(detail_url(self.recipe.id),
+                              HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['tags'][0]['name'], "Baiana")
+
+    def test_assigned_tags_refresh_when_links_change(self):
+        tag = Tag.objects.create(user=self.user, name="Baiana")
+        res = self.client.get(TAG_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'], [])
+
+        self.recipe.tags.add(tag)
+
+        res = self.client.get(TAG_URL, {'assigned_only': 1})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_is_per_user(self):
+        self.client.get(RECIPE_URL)
+
+        other = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        self.client.force_authenticate(other)
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_conditional_get_from_version_lookup(self):
+        """TEST THAT A COLD CACHE ANSWERS 304 FROM ONE VERSION LOOKUP"""
+        res = self.client.get(RECIPE_URL)
+        etag = res['ETag']
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_if_modified_since(self):
+        res = self.client.get(RECIPE_URL)
+        last_modified = res['Last-Modified']
+
+        res = self.client.get(RECIPE_URL,
+                              HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        res = self.client.get(RECIPE_URL,
+                              HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2000 '
+                                                     '00:00:00 GMT')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class SharedCacheCheckTests(TestCase):
+
+    def test_per_process_cache_fails(self):
+        errors = check_shared_cache(None)
+
+        self.assertEqual([error.id for error in errors], ['recipe.E001'])
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': 'memcached:11211',
+    }})
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_shared_cache(None), [])
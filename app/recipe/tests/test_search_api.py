@@ -0,0 +1,157 @@
+from core.models import Recipe, Tag, Ingredient
+from core.search import search_recipes
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+RECIPE_URL = reverse("recipe:recipe-list")
+
+
+def sample_recipe(user, title):
+    return Recipe.objects.create(
+        user=user, title=title, time_minutes=10, price=5.00
+    )
+
+
+def titles(res):
+    return [recipe['title'] for recipe in res.data['results']]
+
+
+class RecipeSearchApiTest(TestCase):
+    """TEST THE ?q= FULL-TEXT RECIPE SEARCH"""
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            "search@recipe.com",
+            'recipetestpassword'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_search_titles_tags_and_ingredients(self):
+        sample_recipe(self.user, "Coconut fish stew")
+        tagged = sample_recipe(self.user, "Moqueca")
+        tagged.tags.add(Tag.objects.create(user=self.user, name="Coconut"))
+        with_ingredient = sample_recipe(self.user, "Cocada")
+        with_ingredient.ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Grated coconut")
+        )
+        sample_recipe(self.user, "Feijoada")
+
+        res = self.client.get(RECIPE_URL, {'q': "coconut"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            titles(res), ["Coconut fish stew", "Moqueca", "Cocada"]
+        )
+
+    def test_search_requires_every_term(self):
+        sample_recipe(self.user, "Banana bread")
+        sample_recipe(self.user, "Banana split")
+
+        res = self.client.get(RECIPE_URL, {'q': "banana bread"})
+
+        self.assertEqual(titles(res), ["Banana bread"])
+
+    def test_search_only_own_recipes(self):
+        other = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        sample_recipe(other, "Tapioca")
+
+        res = self.client.get(RECIPE_URL, {'q': "tapioca"})
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_search_input_is_not_query_syntax(self):
+        sample_recipe(self.user, "Pão de queijo")
+
+        res = self.client.get(RECIPE_URL, {'q': 'queijo" (*'})
+        self.assertEqual(titles(res), ["Pão de queijo"])
+
+        res = self.client.get(RECIPE_URL, {'q': '"*()'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [])
+
+    def test_search_results_paginated_by_rank(self):
+        expected = []
+        for i in range(3):
+            recipe = sample_recipe(self.user, f"Brigadeiro {i}")
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f"Sweet {i}")
+            )
+            expected.insert(0, recipe.title)
+        sample_recipe(self.user, "Sweet corn")
+
+        found = []
+        res = self.client.get(RECIPE_URL, {'q': "brigadeiro",
+                                           'page_size': 2})
+        while True:
+            found += titles(res)
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(found, expected)
+
+    def test_distinct_ranks_paginated_without_gaps(self):
+        """TEST PAGES SPLIT BETWEEN DISTINCT RANKS REPEAT AND SKIP NOTHING"""
+        for i in range(6):
+            sample_recipe(self.user, f"Moqueca {i}")
+        titles_first = [
+            "Feijoada feijoada", "Feijoada", "Feijoada de domingo",
+            "Feijoada completa de sabado",
+        ]
+        for title in titles_first:
+            sample_recipe(self.user, title)
+        sample_recipe(self.user, "Rice").tags.add(
+            Tag.objects.create(user=self.user, name="Feijoada")
+        )
+        sample_recipe(self.user, "Beans").ingredients.add(
+            Ingredient.objects.create(user=self.user, name="Feijoada mix")
+        )
+        hits = search_recipes(Recipe.objects.all(), "feijoada") \
+            .order_by('-rank', '-id')
+        ranks = [hit.rank for hit in hits]
+        self.assertEqual(len(set(ranks)), len(ranks))
+        self.assertTrue(all(isinstance(rank, int) for rank in ranks))
+
+        found = []
+        res = self.client.get(RECIPE_URL, {'q': "feijoada",
+                                           'page_size': 2})
+        while True:
+            found += titles(res)
+            if not res.data['next']:
+                break
+            res = self.client.get(res.data['next'])
+
+        self.assertEqual(found, [hit.title for hit in hits])
+        self.assertEqual(found[:2], titles_first[:2])
+        self.assertEqual(found[-2:], ["Rice", "Beans"])
+
+    def test_index_follows_renames_and_deletes(self):
+        recipe = sample_recipe(self.user, "Acarajé")
+        tag = Tag.objects.create(user=self.user, name="Street food")
+        recipe.tags.add(tag)
+
+        tag.name = "Bahia"
+        tag.save()
+        self.assertEqual(
+            titles(self.client.get(RECIPE_URL, {'q': "bahia"})),
+            ["Acarajé"]
+        )
+
+        tag.delete()
+        self.assertEqual(
+            titles(self.client.get(RECIPE_URL, {'q': "bahia"})), []
+        )
+
+        recipe.title = "Abará"
+        recipe.save()
+        self.assertEqual(
+            titles(self.client.get(RECIPE_URL, {'q': "abará"})),
+            ["Abará"]
+        )
@@ -1,3 +1,5 @@
+from unittest.mock import patch
+
 from core.models import Tag, Recipe
 from django.contrib.auth import get_user_model
 from django.test import TestCase
@@ -7,6 +9,8 @@ from rest_framework import status
 from rest_framework.test import APIClient
 
 TAG_URL = reverse("recipe:tag-list")
+TAG_BULK_URL = reverse("recipe:tag-bulk")
+TAG_SUGGEST_URL = reverse("recipe:tag-suggest")
 
 
 class PublicTagAPITests(TestCase):
@@ -43,7 +47,7 @@ class PrivateTagAPITest(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tags_limited_to_user(self):
         """TEST THAT TAGS RETURNED ARE FOR THE AUTHENTICATED USER"""
@@ -56,8 +60,8 @@ class PrivateTagAPITest(TestCase):
         res = self.client.get(TAG_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], main_user_tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], main_user_tag.name)
         # self.assertEqual(res.data[1]['name'], twoTag.name)
 
     def test_create_tag_sucessful(self):
@@ -93,6 +97,7 @@ class PrivateTagAPITest(TestCase):
         )
 
         recipe.tags.add(tag1)
+        tag1.refresh_from_db()
 
         res = self.client.get(TAG_URL, {'assigned_only': 1})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -100,8 +105,8 @@ class PrivateTagAPITest(TestCase):
         serializer1 = TagSerializer(tag1)
         serializer2 = TagSerializer(tag2)
 
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertNotIn(serializer2.data, res.data['results'])
 
     def test_retrieve_tags_assigned_unique(self):
         Tag.objects.create(user=self.user, name="Breakfast")
@@ -128,4 +133,229 @@ class PrivateTagAPITest(TestCase):
         res = self.client.get(TAG_URL, {'assigned_only': 1})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_paginated_by_cursor(self):
+        """TEST THAT TAGS ARE PAGED WITH AN OPAQUE CURSOR"""
+        for name in ("Breakfast", "Dinner", "Lunch"):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAG_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ["Lunch", "Dinner"]
+        )
+        self.assertIsNotNone(res.data['next'])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ["Breakfast"]
+        )
+        self.assertIsNone(res.data['next'])
+
+    @patch('recipe.pagination.RecipeAttrCursorPagination.max_page_size', 1)
+    def test_tags_page_size_capped(self):
+        """TEST THAT THE REQUESTED PAGE SIZE IS CAPPED"""
+        Tag.objects.create(user=self.user, name="Breakfast")
+        Tag.objects.create(user=self.user, name="Dinner")
+
+        res = self.client.get(TAG_URL, {'page_size': 100})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_bulk_delete_tags_unlinks_recipes(self):
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ("Vegan", "Dessert", "Quick")]
+        recipe = Recipe.objects.create(
+            user=self.user, title="Brigadeiro", time_minutes=20, price=3
+        )
+        recipe.tags.add(*tags)
+
+        res = self.client.delete(
+            TAG_BULK_URL, {'ids': [tags[0].id, tags[1].id]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['deleted'], 2)
+        self.assertEqual(list(recipe.tags.all()), [tags[2]])
+        res = self.client.get(reverse('recipe:recipe-detail',
+                                      args=[recipe.id]))
+        self.assertEqual([tag['id'] for tag in res.data['tags']],
+                         [tags[2].id])
+
+    def test_bulk_create_and_rename_tags(self):
+        res = self.client.post(
+            TAG_BULK_URL, [{'name': "Vegan"}, {'name': "Dessert"}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        vegan_id, dessert_id = res.data['ids']
+
+        res = self.client.patch(
+            TAG_BULK_URL, [{'id': vegan_id, 'name': "Plant based"}],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(Tag.objects.get(id=vegan_id).name, "Plant based")
+        self.assertEqual(Tag.objects.get(id=dessert_id).name, "Dessert")
+
+        res = self.client.get(TAG_URL)
+        self.assertEqual(
+            [tag['name'] for tag in res.data['results']],
+            ["Plant based", "Dessert"]
+        )
+
+    def test_suggest_prefix_matches_first(self):
+        for name in ("Vegetarian", "vegan", "Dessert", "Not vegan"):
+            Tag.objects.create(user=self.user, name=name)
+        other_user = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        Tag.objects.create(user=other_user, name="Vegan")
+
+        res = self.client.get(TAG_SUGGEST_URL, {'q': "veg"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [tag['name'] for tag in res.data],
+            ["vegan", "Vegetarian", "Not vegan"]
+        )
+
+    def test_suggest_query_count(self):
+        """TEST 1 VERSION LOOKUP + 1 INDEXED PREFIX QUERY"""
+        Tag.objects.create(user=self.user, name="Vegan")
+        Tag.objects.create(user=self.user, name="Vegetarian")
+
+        with self.assertNumQueries(2):
+            res = self.client.get(TAG_SUGGEST_URL, {'q': "veg", 'limit': 2})
+
+        self.assertEqual(len(res.data), 2)
+
+    def test_suggest_limit(self):
+        for i in range(5):
+            Tag.objects.create(user=self.user, name=f"Spicy {i}")
+
+        res = self.client.get(TAG_SUGGEST_URL, {'q': "spi", 'limit': 2})
+        self.assertEqual(
+            [tag['name'] for tag in res.data], ["Spicy 0", "Spicy 1"]
+        )
+
+        res = self.client.get(TAG_SUGGEST_URL, {'q': "spi", 'limit': 500})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_suggest_empty_query(self):
+        Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.get(TAG_SUGGEST_URL, {'q': " "})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [])
+
+    def test_recipe_count_follows_links(self):
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        recipes = [
+            Recipe.objects.create(title=f"Recipe {i}", time_minutes=10,
+                                  price=5.00, user=self.user)
+            for i in range(3)
+        ]
+
+        for recipe in recipes:
+            recipe.tags.add(tag)
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 3)
+
+        recipes[0].tags.remove(tag)
+        recipes[1].tags.clear()
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+
+        tag.name = "Brunch"
+        tag.save()
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 1)
+
+        recipes[2].delete()
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
+
+        res = self.client.get(TAG_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'], [])
+
+    def test_recipe_count_follows_bulk_links(self):
+        tag = Tag.objects.create(user=self.user, name="Breakfast")
+        res = self.client.post(
+            reverse("recipe:recipe-bulk"),
+            [{'title': f"Recipe {i}", 'time_minutes': 10, 'price': '5.00',
+              'tags': [tag.id]} for i in range(2)],
+            format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        res = self.client.get(TAG_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'][0]['recipe_count'], 2)
+
+        self.client.patch(
+            reverse("recipe:recipe-bulk"),
+            [{'id': res_id, 'tags': []} for res_id in Recipe.objects
+             .filter(user=self.user).values_list('id', flat=True)],
+            format='json'
+        )
+        tag.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 0)
+
+    def test_create_tag_idempotent(self):
+        """TEST POSTING AN EXISTING NAME, IN ANY CASE, RETURNS IT"""
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.post(TAG_URL, {'name': "VEGAN"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['id'], tag.id)
+        self.assertEqual(res.data['name'], "Vegan")
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_same_name_for_other_user(self):
+        other_user = get_user_model().objects.create_user(
+            "other@recipe.com",
+            'recipetestpassword'
+        )
+        tag = Tag.objects.create(user=other_user, name="Vegan")
+
+        res = self.client.post(TAG_URL, {'name': "Vegan"})
+
+        self.assertNotEqual(res.data['id'], tag.id)
+        self.assertEqual(Tag.objects.filter(name="Vegan").count(), 2)
+
+    def test_bulk_create_merges_duplicate_names(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+
+        res = self.client.post(
+            TAG_BULK_URL,
+            [{'name': "vegan"}, {'name': "Dessert"}, {'name': "DESSERT"}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        vegan_id, dessert_id, dessert_again_id = res.data['ids']
+        self.assertEqual(vegan_id, tag.id)
+        self.assertEqual(dessert_id, dessert_again_id)
+        self.assertEqual(
+            sorted(Tag.objects.filter(user=self.user)
+                   .values_list('name', flat=True)),
+            ["Dessert", "Vegan"]
+        )
+
+    def test_bulk_rename_conflict(self):
+        tag = Tag.objects.create(user=self.user, name="Vegan")
+        Tag.objects.create(user=self.user, name="Dessert")
+
+        res = self.client.patch(
+            TAG_BULK_URL, [{'id': tag.id, 'name': "dessert"}],
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, "Vegan")
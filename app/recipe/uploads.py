@@ -0,0 +1,177 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, \
+    StopFutureHandlers, TemporaryFileUploadHandler
+from django.http.multipartparser import \
+    MultiPartParser as DjangoMultiPartParser, MultiPartParserError
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError, \
+    UnsupportedMediaType
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+from core.models import Recipe, recipe_image_file_path
+
+# Leading bytes of the image formats Pillow can turn into variants
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+SIGNATURE_SIZE = 12
+# room for the multipart boundaries and headers around the file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def sniff_image_type(header):
+    """RETURN THE MIME TYPE OF AN IMAGE FROM ITS FIRST BYTES, OR None"""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, content_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+    return None
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Uploaded image is too large.'
+    default_code = 'too_large'
+
+
+class StoredUploadedFile(UploadedFile):
+    """AN UPLOAD ALREADY WRITTEN TO ITS FINAL PATH IN THE IMAGE STORAGE"""
+
+    def __init__(self, stored_name, path, created, *args, **kwargs):
+        super().__init__(open(path, 'rb'), *args, **kwargs)
+        self.stored_name = stored_name
+        self.path = path
+        self.created = created
+
+    def temporary_file_path(self):
+        # lets the ImageField validation open the file from disk
+        return self.path
+
+    def delete(self):
+        """REMOVE THE STORED FILE, FOR UPLOADS THAT FAIL VALIDATION
+
+        Content that was already stored before this upload is kept.
+        """
+        self.close()
+        if self.created and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class StreamingImageUploadHandler(FileUploadHandler):
+    """WRITE THE 'img' FIELD STRAIGHT TO STORAGE AS IT IS RECEIVED
+
+    Rejects the request from its Content-Length or the first bytes of
+    the file, and hashes the content on the way through, so memory use
+    stays at one chunk whatever the size of the upload. The finished
+    file is moved to its content address in the image storage.
+    """
+    chunk_size = 64 * 1024
+    field_name = 'img'
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+        self.storage = Recipe._meta.get_field('img').storage
+        self.destination = None
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise RequestTooLarge()
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if field_name != self.field_name:
+            return
+
+        self.partial_name = recipe_image_file_path(None, self.file_name)
+        self.partial_path = self.storage.path(self.partial_name)
+        os.makedirs(os.path.dirname(self.partial_path), exist_ok=True)
+        self.destination = open(self.partial_path, 'wb')
+        self.sha256 = hashlib.sha256()
+        self.header = b''
+        self.sniffed_type = None
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.destination is None:
+            return raw_data
+
+        if start + len(raw_data) > self.max_size:
+            self.reject(RequestTooLarge())
+        if self.sniffed_type is None and len(self.header) < SIGNATURE_SIZE:
+            self.header += raw_data[:SIGNATURE_SIZE]
+            if len(self.header) >= SIGNATURE_SIZE:
+                self.check_header()
+
+        self.sha256.update(raw_data)
+        self.destination.write(raw_data)
+
+    def file_complete(self, file_size):
+        if self.destination is None:
+            return None
+
+        if self.sniffed_type is None:
+            self.check_header()
+        self.destination.close()
+        self.destination = None
+
+        sha256 = self.sha256.hexdigest()
+        stored_name, created = self.storage.adopt(self.partial_name, sha256)
+        uploaded = StoredUploadedFile(
+            stored_name, self.storage.path(stored_name), created,
+            name=self.file_name,
+            content_type=self.sniffed_type,
+            size=file_size,
+            charset=self.charset,
+            content_type_extra=self.content_type_extra,
+        )
+        uploaded.sha256 = sha256
+        return uploaded
+
+    def check_header(self):
+        self.sniffed_type = sniff_image_type(self.header)
+        if self.sniffed_type is None:
+            self.reject(UnsupportedMediaType(
+                self.content_type,
+                detail='Upload a valid JPEG, PNG, GIF or WebP image.'
+            ))
+
+    def reject(self, exc):
+        """DISCARD THE PARTIAL FILE AND ABORT THE REQUEST WITH exc"""
+        self.destination.close()
+        self.destination = None
+        os.remove(self.partial_path)
+        raise exc
+
+
+class StreamingImageParser(MultiPartParser):
+    """MULTIPART PARSER THAT STREAMS THE IMAGE FIELD TO STORAGE"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        upload_handlers = [
+            StreamingImageUploadHandler(request),
+            TemporaryFileUploadHandler(request),
+        ]
+
+        try:
+            parser = DjangoMultiPartParser(
+                meta, stream, upload_handlers, encoding
+            )
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise ParseError(f'Multipart form parse error - {exc}')
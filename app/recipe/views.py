@@ -1,23 +1,43 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
 from core.models import Tag, Ingredient, Recipe
+from core.replicas import ReplicaReadMixin
+from core.search import suggest_names
 
 from recipe.serializers import TagSerializer,\
     IngredientSerializer, RecipeSerializer,\
-    RecipeDetailSerializer, RecipeImageSerializer
+    RecipeDetailSerializer, RecipeImageSerializer, RecipeBulkSerializer
+from recipe.bulk import BulkMixin
+from recipe import caching, export
+from recipe.compiled import CompiledReadMixin
+from recipe.images import schedule_image_processing
+from recipe.uploads import StoredUploadedFile, StreamingImageParser
+from recipe.filters import RecipeRelatedFilter, RecipeSearchFilter
+from recipe.pagination import RecipeAttrCursorPagination, \
+    RecipeCursorPagination
 
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
+from user.authentication import CachedTokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            caching.CachedResponseMixin,
+                            BulkMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """BASE VIEWSET FOR USER OWNED RECIPE ATTRIBUTES"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = RecipeAttrCursorPagination
+    throttle_scopes = {'create': 'recipe_write', 'bulk': 'bulk_write'}
+    suggest_limit = 10
+    max_suggest_limit = 50
 
     def get_queryset(self):
         """RETURN OBJECTS FOR THE AUTHENTICATED USER ONLY"""
@@ -26,66 +46,149 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.assigned()
 
         return queryset.filter(user=self.request.user)\
-            .order_by("-name").distinct()
+            .only('id', 'name', 'recipe_count').order_by("-name")
 
     def perform_create(self, serializer):
-        """create a object fot the current authenticated user only"""
-        serializer.save(user=self.request.user)
+        """GET OR CREATE THE NAMED OBJECT FOR THE CURRENT USER
+
+        Idempotent: posting an existing name, in any case, returns the
+        existing object instead of a duplicate.
+        """
+        serializer.instance = self.queryset.upsert(
+            self.request.user, [serializer.validated_data['name']]
+        )[0]
+        caching.bump_versions(self.request.user.pk, *self.cache_kinds)
+
+    def perform_bulk_create(self, validated):
+        rows = self.queryset.upsert(
+            self.request.user, [data['name'] for data in validated]
+        )
+        return [row.pk for row in rows]
+
+    @action(methods=['GET'], detail=False)
+    def suggest(self, request):
+        """AUTOCOMPLETE ?q= WITH THE USER'S TOP ?limit= MATCHING NAMES"""
+        return self.cached_response(self.suggestions, request)
+
+    def suggestions(self, request):
+        q = request.query_params.get('q', '').strip()
+        try:
+            limit = int(request.query_params.get('limit',
+                                                 self.suggest_limit))
+        except ValueError:
+            limit = 0
+        if not 0 < limit <= self.max_suggest_limit:
+            raise ValidationError({'limit': [
+                f"Must be between 1 and {self.max_suggest_limit}."
+            ]})
+        if not q:
+            return Response([])
+
+        matches = suggest_names(
+            self.owned().only('id', 'name', 'recipe_count'), q, limit
+        )
+        return Response(self.get_serializer(matches, many=True).data)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    cache_kinds = (caching.TAGS,)
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    cache_kinds = (caching.INGREDIENTS,)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, caching.CachedResponseMixin,
+                    CompiledReadMixin, BulkMixin, viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication, ]
     permission_classes = [IsAuthenticated, ]
-
-    def _params_to_ints(self, qs):
-        """CONVERT A LIST OF STRING IDS TO A LIST OF INT"""
-        return [int(str_id) for str_id in qs.split(',')]
+    pagination_class = RecipeCursorPagination
+    filter_backends = (RecipeRelatedFilter, RecipeSearchFilter)
+    throttle_scopes = {
+        'create': 'recipe_write',
+        'update': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'destroy': 'recipe_write',
+        'bulk': 'bulk_write',
+        'upload_image': 'image_upload',
+        'export': 'export',
+    }
+    bulk_relations = ('tags', 'ingredients')
+    export_columns = ('id', 'title', 'time_minutes', 'price', 'link',
+                      'tags', 'ingredients', 'img')
 
     def get_queryset(self):
         """RETRIEVE THE RECIPE FOR THE AUTHENTICATED USER"""
-        tags = self.request.query_params.get("tags")
-        ingredients = self.request.query_params.get("ingredients")
         queryset = self.queryset
 
-        if tags:
-            tags_id = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tags_id)
-
-        if ingredients:
-            ingredients_id = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredients_id)
+        if self.action == 'list':
+            queryset = queryset.for_list()
+        elif self.action in ('retrieve', 'export'):
+            queryset = queryset.for_detail()
 
         return queryset.filter(user=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
     def get_serializer_class(self):
         """RETURN APPROPRIATE SERIALIZER CLASS"""
-        if self.action == 'retrieve':
+        if self.action in ('retrieve', 'export'):
             return RecipeDetailSerializer
         elif self.action == 'upload_image':
             return RecipeImageSerializer
+        elif self.action == 'bulk':
+            return RecipeBulkSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    @action(methods=["POST"], detail=True, url_path='upload-image')
+    @action(methods=['GET'], detail=False,
+            renderer_classes=(export.NDJSONRenderer, export.CSVRenderer))
+    def export(self, request):
+        """STREAM THE USER'S WHOLE RECIPE BOOK AS NDJSON OR CSV
+
+        ?format=ndjson (the default) or ?format=csv. Recipes are read
+        EXPORT_CHUNK_SIZE at a time, so memory does not grow with the
+        size of the book.
+        """
+        queryset = self.get_queryset().order_by('id')
+        # picked now, the replica is no longer selected while streaming
+        queryset = queryset.using(queryset.db)
+        renderer = request.accepted_renderer
+        context = dict(self.get_renderer_context(),
+                       columns=self.export_columns)
+
+        response = StreamingHttpResponse(
+            export.stream(queryset, self.compiled(), renderer, context,
+                          settings.EXPORT_CHUNK_SIZE),
+            content_type=f"{renderer.media_type}; charset=utf-8"
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="recipes.{renderer.format}"'
+        return response
+
+    @action(methods=["POST"], detail=True, url_path='upload-image',
+            parser_classes=(StreamingImageParser,))
     def upload_image(self, request, pk=None):
-        """UPLOAD AN IMAGE TO A RECIPE"""
+        """UPLOAD AN IMAGE TO A RECIPE
+
+        The original is streamed straight to storage by
+        StreamingImageParser; EXIF stripping and the resized
+        variants are produced in the background (see img_status).
+        """
         recipe = self.get_object()
         serializer = self.get_serializer(
             recipe,
@@ -93,12 +196,17 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(img_status=Recipe.IMG_PENDING)
+            schedule_image_processing(recipe)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
             )
 
+        img = request.data.get('img')
+        if isinstance(img, StoredUploadedFile):
+            img.delete()
+
         return Response(
                 serializer.errors,
                 status=status.HTTP_400_BAD_REQUEST
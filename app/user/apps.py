@@ -1,5 +1,17 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
 
 
 class UserConfig(AppConfig):
     name = 'user'
+
+    def ready(self):
+        from rest_framework.authtoken.models import Token
+        from user.authentication import invalidate_token, \
+            invalidate_user_tokens
+
+        post_delete.connect(invalidate_token, sender=Token)
+        post_save.connect(
+            invalidate_user_tokens, sender=settings.AUTH_USER_MODEL
+        )
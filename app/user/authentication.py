@@ -0,0 +1,135 @@
+import copy
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.cache import LRUCache
+
+
+class TokenCache:
+    """TWO TIER TOKEN KEY -> TOKEN CACHE
+
+    The in-process LRU answers hot clients without any I/O. When
+    TOKEN_AUTH_CACHE['CACHE_ALIAS'] names a Django cache, it is used as
+    a shared second tier and local entries only live LOCAL_TTL seconds:
+    a token deleted or rotated on one worker stops authenticating on
+    the others within that time.
+    """
+    key_prefix = 'auth-token:'
+
+    def __init__(self, max_size, ttl):
+        self.ttl = ttl
+        self.local = LRUCache(max_size, ttl)
+
+    @property
+    def shared(self):
+        alias = settings.TOKEN_AUTH_CACHE.get('CACHE_ALIAS')
+        return caches[alias] if alias else None
+
+    @property
+    def local_ttl(self):
+        """HOW LONG THIS WORKER TRUSTS ITS OWN COPY OF A TOKEN"""
+        if self.shared is None:
+            return self.ttl
+        return settings.TOKEN_AUTH_CACHE.get('LOCAL_TTL', self.ttl)
+
+    def get(self, key):
+        token = self.local.get(key)
+        if token is None and self.shared is not None:
+            token = self.shared.get(self.key_prefix + key)
+            if token is not None:
+                self.local.set(key, token, self.local_ttl)
+        return token
+
+    def set(self, key, token):
+        self.local.set(key, token, self.local_ttl)
+        if self.shared is not None:
+            self.shared.set(self.key_prefix + key, token, self.ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self.key_prefix + key)
+
+    def clear(self):
+        self.local.clear()
+
+
+token_cache = TokenCache(
+    max_size=settings.TOKEN_AUTH_CACHE['MAX_SIZE'],
+    ttl=settings.TOKEN_AUTH_CACHE['TTL'],
+)
+
+
+def expired_before():
+    """TOKENS LAST RENEWED BEFORE THIS INSTANT HAVE EXPIRED"""
+    return timezone.now() - timedelta(seconds=settings.TOKEN_EXPIRY['TTL'])
+
+
+def renew_if_due(token):
+    """SLIDE THE EXPIRY OF A TOKEN IN USE, AT MOST ONCE PER RENEW_AFTER
+
+    Token.created is the last renewal, served by an index for sweeping.
+    """
+    now = timezone.now()
+    renew_after = timedelta(seconds=settings.TOKEN_EXPIRY['RENEW_AFTER'])
+    if token.created <= now - renew_after:
+        Token.objects.filter(key=token.key).update(created=now)
+        token.created = now
+        return True
+    return False
+
+
+def issue_token(user):
+    """RETURN THE USER'S TOKEN, RENEWED, OR A NEW ONE IF IT EXPIRED"""
+    token, created = Token.objects.get_or_create(user=user)
+    if created:
+        return token
+    if token.created < expired_before():
+        token.delete()
+        return Token.objects.create(user=user)
+    if renew_if_due(token):
+        token_cache.delete(token.key)
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TOKEN AUTHENTICATION THAT CACHES THE TOKEN -> USER LOOKUP
+
+    Tokens expire TOKEN_EXPIRY['TTL'] seconds after their last renewal,
+    each use renews them.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is not None and token.created < expired_before():
+            # another worker may have renewed it since it was cached
+            token_cache.delete(key)
+            token = None
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            if token.created < expired_before():
+                token.delete()
+                raise AuthenticationFailed("Token has expired.")
+            token_cache.set(key, token)
+        if renew_if_due(token):
+            token_cache.set(key, token)
+        # hand every request its own user so views can't mutate the cache
+        return (copy.copy(token.user), token)
+
+
+def invalidate_token(sender, instance, **kwargs):
+    """DROP A DELETED TOKEN FROM THE CACHE"""
+    token_cache.delete(instance.key)
+
+
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """DROP THE CACHED TOKENS OF A CHANGED OR DELETED USER"""
+    for key in Token.objects.filter(user_id=instance.pk) \
+            .values_list('key', flat=True):
+        token_cache.delete(key)
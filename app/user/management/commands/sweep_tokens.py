@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from rest_framework.authtoken.models import Token
+
+from user.authentication import expired_before
+
+
+class Command(BaseCommand):
+    """DJANGO COMMAND TO DELETE EXPIRED AUTH TOKENS IN BATCHES"""
+    help = "Delete the auth tokens whose TOKEN_EXPIRY['TTL'] has passed, " \
+           "a batch per short transaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pause', type=float, default=0,
+                            help="Seconds to sleep between batches.")
+
+    def handle(self, *args, **options):
+        cutoff = expired_before()
+        # the created index serves both the range and the order
+        expired = Token.objects.filter(created__lt=cutoff) \
+            .order_by('created').values_list('key', flat=True)
+
+        deleted = 0
+        while True:
+            keys = list(expired[:options['batch_size']])
+            if not keys:
+                break
+            # the post_delete signal drops them from the token cache
+            Token.objects.filter(key__in=keys).delete()
+            deleted += len(keys)
+            if options['pause']:
+                time.sleep(options['pause'])
+
+        self.stdout.write(f"Deleted {deleted} expired tokens.")
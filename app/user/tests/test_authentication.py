@@ -0,0 +1,187 @@
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.cache import LRUCache
+from user.authentication import token_cache
+from user.tests.test_user_api import create_user
+
+ME_URL = reverse("user:me")
+TOKEN_URL = reverse("user:token")
+
+
+class LRUCacheTests(TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_expired_entries_are_missing(self):
+        cache = LRUCache(max_size=2, ttl=-1)
+        cache.set('a', 1)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(len(cache), 0)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """TEST THE CACHED TOKEN -> USER RESOLUTION"""
+
+    def setUp(self) -> None:
+        token_cache.clear()
+        self.user = create_user(
+            email="cache@teste.com",
+            password="cachepassword",
+            name="Cache"
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_second_request_skips_token_lookup(self):
+        with self.assertNumQueries(1):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_deleted_token_rejected(self):
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE={
+        'MAX_SIZE': 10, 'TTL': 60, 'CACHE_ALIAS': 'default'
+    })
+    def test_shared_tier_serves_other_workers(self):
+        self.client.get(ME_URL)
+        # simulate a different worker whose local tier is empty
+        token_cache.local.clear()
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(TOKEN_AUTH_CACHE={
+        'MAX_SIZE': 10, 'TTL': 60, 'LOCAL_TTL': 5, 'CACHE_ALIAS': 'default'
+    })
+    def test_revocation_reaches_other_workers(self):
+        """TEST A TOKEN DELETED ELSEWHERE OUTLIVES NO LOCAL_TTL HERE"""
+        self.client.get(ME_URL)
+        # deleted by another worker: gone from the database and the
+        # shared tier, this worker's local copy is left behind
+        Token.objects.filter(key=self.token.key)._raw_delete('default')
+        token_cache.shared.delete(token_cache.key_prefix + self.token.key)
+        self.assertIsNotNone(token_cache.local.get(self.token.key))
+
+        later = time.monotonic() + 6
+        with patch('core.cache.time.monotonic', return_value=later):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_token_rejected(self):
+        self.client.get(ME_URL)
+        Token.objects.filter(key=self.token.key).update(
+            created=timezone.now() - timedelta(days=30)
+        )
+        token_cache.clear()
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+    def test_cached_token_expires(self):
+        self.client.get(ME_URL)
+        token_cache.get(self.token.key).created -= timedelta(days=30)
+        Token.objects.filter(key=self.token.key).update(
+            created=timezone.now() - timedelta(days=30)
+        )
+
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_use_renews_token(self):
+        """TEST A TOKEN USED AFTER RENEW_AFTER GETS A FULL TTL AGAIN"""
+        old = timezone.now() - timedelta(days=10)
+        Token.objects.filter(key=self.token.key).update(created=old)
+
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.token.refresh_from_db()
+        self.assertGreater(self.token.created, old + timedelta(days=9))
+
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+
+class CreateTokenReuseTests(TestCase):
+
+    def setUp(self) -> None:
+        token_cache.clear()
+        self.payload = {'email': "reuse@teste.com", 'password': "reusepass"}
+        self.user = create_user(**self.payload)
+        self.client = APIClient()
+
+    def test_login_reuses_live_token(self):
+        first = self.client.post(TOKEN_URL, self.payload).data['token']
+        second = self.client.post(TOKEN_URL, self.payload).data['token']
+
+        self.assertEqual(first, second)
+
+    def test_login_replaces_expired_token(self):
+        first = self.client.post(TOKEN_URL, self.payload).data['token']
+        Token.objects.filter(key=first).update(
+            created=timezone.now() - timedelta(days=30)
+        )
+
+        second = self.client.post(TOKEN_URL, self.payload).data['token']
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(Token.objects.get(user=self.user).key, second)
+
+    def test_sweep_deletes_expired_tokens(self):
+        other = create_user(email="other@teste.com", password="otherpass")
+        expired = Token.objects.create(user=self.user)
+        live = Token.objects.create(user=other)
+        Token.objects.filter(key=expired.key).update(
+            created=timezone.now() - timedelta(days=30)
+        )
+        out = StringIO()
+
+        call_command('sweep_tokens', batch_size=1, stdout=out)
+
+        self.assertEqual(
+            list(Token.objects.values_list('key', flat=True)), [live.key]
+        )
+        self.assertIn("Deleted 1 expired tokens.", out.getvalue())
@@ -1,8 +1,12 @@
+from unittest.mock import patch
+
+from django.contrib.auth.hashers import make_password
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from core.hashers import HashingBusy
 from user.tests.test_user_api import create_user
 
 TOKEN_URL = reverse("user:token")
@@ -59,3 +63,30 @@ class PublicUserTokenAPITests(TestCase):
         res = self.client.post(TOKEN_URL, {"email": "one", 'password': ''})
         self.assertNotIn('token', res.data)
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_login_rehashes_old_password_hash(self):
+        """TEST A PBKDF2 HASH IS UPGRADED TO THE PREFERRED HASHER"""
+        user = create_user(email="teste@gmail.com", password="aijadjiijda")
+        user.password = make_password("aijadjiijda", hasher='pbkdf2_sha256')
+        user.save()
+
+        res = self.client.post(
+            TOKEN_URL, {"email": "teste@gmail.com", 'password': "aijadjiijda"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('argon2$'))
+        self.assertTrue(user.check_password("aijadjiijda"))
+
+    def test_login_when_hashing_busy(self):
+        create_user(email="teste@gmail.com", password="aijadjiijda")
+
+        with patch('core.hashers.pool.run', side_effect=HashingBusy):
+            res = self.client.post(
+                TOKEN_URL,
+                {"email": "teste@gmail.com", 'password': "aijadjiijda"}
+            )
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_503_SERVICE_UNAVAILABLE)
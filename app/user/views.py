@@ -1,8 +1,12 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
+from .authentication import CachedTokenAuthentication, issue_token
 from .serializers import UserSerializer, AuthTokenSerializer
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.replicas import ReplicaReadMixin
+
 
 class CreateUserView(generics.CreateAPIView):
     """CREATE A NEW USER IN THE SYSTEM"""
@@ -13,12 +17,24 @@ class CreateUserView(generics.CreateAPIView):
 class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # ObtainAuthToken turns throttling off
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'login'
+
+    def post(self, request, *args, **kwargs):
+        """REUSE THE USER'S LIVE TOKEN INSTEAD OF ISSUING ONE PER LOGIN"""
+        serializer = self.serializer_class(
+            data=request.data, context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        token = issue_token(serializer.validated_data['user'])
+        return Response({'token': token.key})
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ReplicaReadMixin, generics.RetrieveUpdateAPIView):
     """MANAGE THE AUTHENTICATED USER"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):